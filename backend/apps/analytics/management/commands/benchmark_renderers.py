@@ -0,0 +1,64 @@
+"""
+Benchmark de renderers JSON sobre los listados de registros y vehículos
+
+Uso:
+    python manage.py benchmark_renderers --rows 5000 --repeat 10
+"""
+
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.registers.views import RegisterViewSet
+from apps.vehicles.views import VehicleViewSet
+from core.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Compara tiempo y bytes de JSONRenderer vs FastJSONRenderer en listados grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Filas a serializar por listado')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por renderer')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson no está instalado: FastJSONRenderer usará el encoder estándar'
+            ))
+
+        for viewset_class in (RegisterViewSet, VehicleViewSet):
+            data, serialize_seconds = self._serialize(viewset_class, rows)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{viewset_class.__name__}: {len(data)} filas '
+                f'(serializer: {serialize_seconds * 1000:.1f} ms)'
+            ))
+
+            for renderer_class in (JSONRenderer, FastJSONRenderer):
+                renderer = renderer_class()
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    content = renderer.render(data, 'application/json', {})
+                elapsed = (time.perf_counter() - start) / repeat
+                self.stdout.write(
+                    f'  {renderer_class.__name__:<18} {elapsed * 1000:8.2f} ms  {len(content):>10} bytes'
+                )
+
+    def _serialize(self, viewset_class, rows):
+        """Serializa las primeras `rows` filas del listado tal como lo hace el ViewSet"""
+        request = Request(APIRequestFactory().get('/'))
+        request.user = SimpleNamespace(is_superuser=True, distribuidor=None)
+
+        view = viewset_class(request=request, format_kwarg=None, action='list', kwargs={})
+        queryset = view.get_queryset()[:rows]
+
+        start = time.perf_counter()
+        data = view.get_serializer(queryset, many=True).data
+        return data, time.perf_counter() - start
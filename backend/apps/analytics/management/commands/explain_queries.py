@@ -0,0 +1,78 @@
+"""
+EXPLAIN y tiempos de las consultas más calientes de analytics, API y ETL
+
+Correr antes y después de aplicar migraciones de índices para comparar planes:
+    python manage.py explain_queries --days 30 --repeat 5
+    python manage.py explain_queries --analyze   # EXPLAIN ANALYZE (PostgreSQL / MySQL 8)
+"""
+
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.registers.models import Register
+from apps.vehicles.models import Vehicle, start_of_today
+
+
+class Command(BaseCommand):
+    help = 'Muestra EXPLAIN y tiempo medio de las consultas más usadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Ventana de fechas para las consultas de registros')
+        parser.add_argument('--repeat', type=int, default=5, help='Ejecuciones para medir el tiempo')
+        parser.add_argument('--analyze', action='store_true', help='Usar EXPLAIN ANALYZE')
+
+    def handle(self, *args, **options):
+        for name, queryset in self._queries(options['days']):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name}'))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(analyze=True) if options['analyze'] else queryset.explain())
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                rows = list(queryset.all())
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(self.style.SUCCESS(
+                f'   {len(rows)} filas, mediana {statistics.median(timings) * 1000:.2f} ms\n'
+            ))
+
+    def _queries(self, days):
+        today = timezone.now().date()
+        start_date = today - timedelta(days=days)
+        vehicle = Vehicle.objects.order_by('id').values('id', 'group_id', 'distribuidor_id').first() or {
+            'id': 0, 'group_id': 0, 'distribuidor_id': 0
+        }
+
+        return [
+            ('summary_matrix: desconexiones por grupo/contrato/día del rango',
+             Register.objects.filter(report_date__range=(start_date, today)).values(
+                 'group_id', 'contrato_id', 'report_date'
+             ).annotate(
+                 count=Count('id'), route=Count('id', filter=Q(disconnection_kind=Register.KIND_ROUTE))
+             ).order_by()),
+            ('top_disconnected: conteo por vehículo en la ventana',
+             Register.objects.filter(report_date__gte=start_date).values('vehicle_id').annotate(
+                 total=Count('id')
+             ).order_by()),
+            ('registros por estatus_final en la ventana',
+             Register.objects.filter(
+                 estatus_final=Register.ESTATUS_BASE, report_date__gte=start_date
+             ).values('id').order_by()),
+            ('listado de registros por distribuidor (primera página)',
+             Register.objects.filter(distribuidor_id=vehicle['distribuidor_id']).order_by(
+                 '-report_date', '-id'
+             ).values('id')[:20]),
+            ('ETL: ¿ya existe registro hoy para el vehículo?',
+             Register.objects.filter(vehicle_id=vehicle['id'], report_date=today).values('id')[:1]),
+            ('statistics: desconectados del distribuidor',
+             Vehicle.objects.filter(
+                 distribuidor_id=vehicle['distribuidor_id'], last_connection__lt=start_of_today()
+             ).values('id').order_by()),
+            ('vehículos del grupo por última conexión',
+             Vehicle.objects.filter(group_id=vehicle['group_id']).order_by('-last_connection').values('id')[:20]),
+        ]
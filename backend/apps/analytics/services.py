@@ -0,0 +1,89 @@
+"""
+Services for Analytics App
+Top-N engine for the most disconnected vehicles
+"""
+
+from datetime import timedelta
+from typing import Dict, List, Optional
+import heapq
+import logging
+
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.registers.models import Register
+from apps.vehicles.models import Vehicle, DISCONNECTION_COUNTER_FIELDS
+from apps.authentication.scoping import scope_cache_key
+from core.cache import get_or_compute
+
+logger = logging.getLogger(__name__)
+
+
+class TopDisconnectedService:
+    """
+    Top-N of vehicles by disconnections in the last `days` days.
+
+    - 7 and 30 days read the counters kept on Vehicle by the ETL
+      (indexed ORDER BY ... LIMIT).
+    - Other windows count registers per vehicle over the
+      (report_date, vehicle) index, one row per vehicle and day, and pick
+      the top N with a heap instead of sorting every vehicle.
+
+    Results are cached per (days, limit, distributor scope) until the next
+    ETL load bumps the cache generation.
+    """
+
+    MAX_LIMIT = 100
+    MAX_DAYS = 365
+
+    @staticmethod
+    def get_top(days: int, limit: int, distribuidor_id: Optional[int] = None) -> List[Dict]:
+        """
+        Args:
+            days: Window in days, today included (1..MAX_DAYS)
+            limit: Number of vehicles (1..MAX_LIMIT)
+            distribuidor_id: Restrict to one distributor (None = whole fleet)
+
+        Returns:
+            List of vehicle dicts, most disconnected first
+        """
+        return get_or_compute(
+            'top_disconnected',
+            (days, limit, scope_cache_key(distribuidor_id)),
+            lambda: TopDisconnectedService._compute(days, limit, distribuidor_id),
+        )
+
+    @staticmethod
+    def _compute(days: int, limit: int, distribuidor_id: Optional[int]) -> List[Dict]:
+        if days in DISCONNECTION_COUNTER_FIELDS:
+            vehicles = Vehicle.objects.all()
+            if distribuidor_id:
+                vehicles = vehicles.filter(distribuidor_id=distribuidor_id)
+            top = list(vehicles.top_disconnected(days).values_list('id', 'disconnection_count')[:limit])
+        else:
+            start_date = timezone.localdate() - timedelta(days=days - 1)
+            registers = Register.objects.filter(report_date__gte=start_date)
+            if distribuidor_id:
+                registers = registers.filter(distribuidor_id=distribuidor_id)
+            counts = registers.values_list('vehicle_id').annotate(total=Count('id')).order_by()
+            # Same order as top_disconnected: count, then newest id
+            top = heapq.nlargest(limit, counts.iterator(), key=lambda row: (row[1], row[0]))
+
+        vehicles = Vehicle.objects.select_related('group__client').in_bulk([vehicle_id for vehicle_id, _ in top])
+        results = []
+        for vehicle_id, disconnection_count in top:
+            vehicle = vehicles.get(vehicle_id)
+            if vehicle is None:
+                continue
+            group = vehicle.group
+            results.append({
+                'vin': vehicle.vin,
+                'vehicle_id': vehicle.vehicle_id,
+                'group': group.group_description if group else None,
+                'client': group.client.client_description if group and group.client else None,
+                'disconnection_count': disconnection_count,
+                'disconnection_streak': vehicle.disconnection_streak,
+                'dark_since': vehicle.dark_since.isoformat() if vehicle.dark_since else None,
+                'last_connection': vehicle.last_connection.isoformat() if vehicle.last_connection else None,
+            })
+        return results
@@ -9,4 +9,5 @@ urlpatterns = [
     path('summary-matrix/', views.summary_matrix, name='summary-matrix'),
     path('group/<int:group_id>/stats/', views.group_stats, name='group-stats'),
     path('top-disconnected/', views.top_disconnected_vehicles, name='top-disconnected'),
+    path('connectivity-series/', views.connectivity_series, name='connectivity-series'),
 ]
@@ -7,12 +7,15 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Count, Q, F
+from django.db.models.functions import TruncWeek, TruncMonth
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 from apps.registers.models import Register
-from apps.vehicles.models import Vehicle
+from apps.vehicles.models import Vehicle, VehicleSnapshot, Contrato
 from apps.organization.models import Group, Client
+from apps.authentication.scoping import get_scope, scope_queryset
+from .services import TopDisconnectedService
 
 
 @api_view(['GET'])
@@ -22,6 +25,17 @@ def summary_matrix(request):
     Endpoint para matriz de resumen - OPTIMIZADO
     Retorna datos agregados de vehículos conectados/desconectados
     organizados por grupo y contrato
+
+    Con `?format=columnar` cada contrato lleva un solo `total` y arreglos
+    enteros (`totals`, `connected`, `disconnected`, `route`, `base`)
+    alineados con `dates`, en lugar de un dict por celda.
+
+    Los días con foto diaria (VehicleSnapshot) usan el total y los
+    conectados reales de ese día; los demás conservan la aproximación
+    flota actual - desconexiones.
+
+    Usuarios de un distribuidor: solo sus vehículos, registros y fotos, y
+    solo los grupos donde tienen vehículos.
     """
     from collections import defaultdict
     
@@ -53,45 +67,75 @@ def summary_matrix(request):
     if group_id:
         groups_query = groups_query.filter(id=group_id)
     
-    # Obtener todos los vehículos de una vez
-    vehicles_query = Vehicle.objects.select_related('group', 'group__client')
+    # Obtener todos los vehículos de una vez (solo las columnas necesarias)
+    vehicles_query = scope_queryset(Vehicle.objects.all(), request.user)
     if group_id:
         vehicles_query = vehicles_query.filter(group_id=group_id)
     
     # Crear índice de vehículos por grupo y contrato
-    vehicles_by_group_contract = defaultdict(lambda: defaultdict(list))
-    for vehicle in vehicles_query:
-        contract_key = vehicle.contrato if vehicle.contrato else 'null'
-        vehicles_by_group_contract[vehicle.group_id][contract_key].append(vehicle.id)
+    vehicles_by_group_contract = defaultdict(dict)
+    contract_names = {}
+    for vehicle_group_id, contrato_id, contrato_name in vehicles_query.values_list(
+        'group_id', 'contrato_id', 'contrato__contrato'
+    ).order_by():
+        contract_key = contrato_id if contrato_id else 'null'
+        contracts = vehicles_by_group_contract[vehicle_group_id]
+        contracts[contract_key] = contracts.get(contract_key, 0) + 1
+        contract_names[contract_key] = contrato_name
     
-    # Obtener todos los registros de desconexión en el rango de fechas de una vez
-    registers = Register.objects.filter(
+    # Conteos de desconexión por grupo, contrato y fecha agregados en SQL
+    # (grupo, contrato y clase vienen del registro: sin JOIN a vehicles)
+    registers = scope_queryset(Register.objects.all(), request.user).filter(
         report_date__gte=start_date,
         report_date__lte=end_date
-    ).select_related('vehicle').values(
-        'vehicle_id',
-        'vehicle__group_id',
-        'vehicle__contrato',
-        'report_date',
-        'problem'
-    )
+    ).values(
+        'group_id',
+        'contrato_id',
+        'report_date'
+    ).annotate(
+        count=Count('id'),
+        route=Count('id', filter=Q(disconnection_kind=Register.KIND_ROUTE)),
+    ).order_by()
     
     # Crear índice de desconexiones por grupo, contrato y fecha
-    disconnections_index = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {'count': 0, 'route': 0, 'base': 0})))
+    disconnections_index = defaultdict(lambda: defaultdict(dict))
     
-    for register in registers:
-        group_id = register['vehicle__group_id']
-        contract_key = register['vehicle__contrato'] if register['vehicle__contrato'] else 'null'
-        date_key = register['report_date']
-        
-        disconnections_index[group_id][contract_key][date_key]['count'] += 1
-        
-        if 'trayecto' in register['problem'].lower():
-            disconnections_index[group_id][contract_key][date_key]['route'] += 1
-        else:
-            disconnections_index[group_id][contract_key][date_key]['base'] += 1
+    for row in registers:
+        contract_key = row['contrato_id'] if row['contrato_id'] else 'null'
+        disconnections_index[row['group_id']][contract_key][row['report_date']] = {
+            'count': row['count'],
+            'route': row['route'],
+            'base': row['count'] - row['route'],
+        }
+    
+    # Total y conectados por grupo, contrato y día desde las fotos diarias
+    snapshots = VehicleSnapshot.objects.filter(snapshot_date__range=(start_date, end_date))
+    snapshot_dates = set(snapshots.values_list('snapshot_date', flat=True).distinct().order_by())
+    snapshots = scope_queryset(snapshots, request.user, 'vehicle__distribuidor')
+    if group_id:
+        snapshots = snapshots.filter(group_id=group_id)
+    
+    snapshots_index = defaultdict(lambda: defaultdict(dict))
+    for row in snapshots.values('group_id', 'contrato_id', 'snapshot_date').annotate(
+        total=Count('id'),
+        connected=Count('id', filter=Q(connected=True)),
+    ).order_by():
+        contract_key = row['contrato_id'] if row['contrato_id'] else 'null'
+        snapshots_index[row['group_id']][contract_key][row['snapshot_date']] = (row['total'], row['connected'])
+        # Contratos que ya no tiene ningún vehículo siguen en el histórico
+        vehicles_by_group_contract[row['group_id']].setdefault(contract_key, 0)
+    
+    missing_names = [key for contracts in vehicles_by_group_contract.values()
+                     for key in contracts if key != 'null' and key not in contract_names]
+    if missing_names:
+        contract_names.update(Contrato.objects.filter(id__in=missing_names).values_list('id', 'contrato'))
+    
+    if get_scope(request.user) is not None:
+        groups_query = groups_query.filter(id__in=list(vehicles_by_group_contract))
     
     # Construir respuesta
+    columnar = request.query_params.get('format') == 'columnar'
+    empty_day = {'count': 0, 'route': 0, 'base': 0}
     groups_data = []
     
     for group in groups_query:
@@ -105,31 +149,52 @@ def summary_matrix(request):
         # Obtener contratos únicos del grupo
         contracts = vehicles_by_group_contract.get(group.id, {})
         
-        for contract_key, vehicle_ids in contracts.items():
+        for contract_key, total_vehicles in contracts.items():
+            contract_name = (
+                f'Contrato {contract_names[contract_key]}' if contract_key != 'null' else 'Sin Contrato'
+            )
+            contract_id = contract_key if contract_key != 'null' else None
+            contract_disconnections = disconnections_index[group.id][contract_key]
+            contract_snapshots = snapshots_index[group.id][contract_key]
+            daily = [contract_disconnections.get(date, empty_day) for date in dates]
+            
+            # (total, conectados) por día: foto diaria si existe, si no aproximación
+            fleet = [
+                contract_snapshots.get(date, (0, 0)) if date in snapshot_dates
+                else (total_vehicles, total_vehicles - day['count'])
+                for date, day in zip(dates, daily)
+            ]
+            
+            if columnar:
+                # Formato columnar: un solo total y arreglos alineados con 'dates'
+                group_matrix['data'].append({
+                    'contract_name': contract_name,
+                    'contract_id': contract_id,
+                    'total': total_vehicles,
+                    'totals': [total for total, _ in fleet],
+                    'connected': [connected for _, connected in fleet],
+                    'disconnected': [day['count'] for day in daily],
+                    'route': [day['route'] for day in daily],
+                    'base': [day['base'] for day in daily],
+                })
+                continue
+            
             contract_data = {
-                'contract_name': f'Contrato {contract_key}' if contract_key != 'null' else 'Sin Contrato',
-                'contract_id': contract_key if contract_key != 'null' else None,
+                'contract_name': contract_name,
+                'contract_id': contract_id,
                 'daily_data': []
             }
             
-            total_vehicles = len(vehicle_ids)
-            
             # Procesar cada fecha
-            for date in dates:
-                # Obtener desconexiones de este grupo/contrato/fecha
-                disconnections = disconnections_index[group.id][contract_key].get(date, {'count': 0, 'route': 0, 'base': 0})
-                
-                disconnected = disconnections['count']
-                connected = total_vehicles - disconnected
-                
+            for date, disconnections, (total, connected) in zip(dates, daily, fleet):
                 contract_data['daily_data'].append({
                     'date': date.strftime('%Y-%m-%d'),
-                    'total': total_vehicles,
+                    'total': total,
                     'connected': connected,
-                    'disconnected': disconnected,
+                    'disconnected': disconnections['count'],
                     'route': disconnections['route'],
                     'base': disconnections['base'],
-                    'percentage_connected': round((connected / total_vehicles * 100), 2) if total_vehicles > 0 else 0
+                    'percentage_connected': round((connected / total * 100), 2) if total > 0 else 0
                 })
             
             group_matrix['data'].append(contract_data)
@@ -139,6 +204,7 @@ def summary_matrix(request):
     return Response({
         'start_date': start_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
+        'format': 'columnar' if columnar else 'cells',
         'dates': [d.strftime('%Y-%m-%d') for d in dates],
         'groups': groups_data
     })
@@ -149,6 +215,7 @@ def summary_matrix(request):
 def group_stats(request, group_id):
     """
     Estadísticas de un grupo específico
+    (solo los vehículos y registros del distribuidor del usuario)
     """
     try:
         group = Group.objects.get(id=group_id)
@@ -160,25 +227,32 @@ def group_stats(request, group_id):
     start_date = timezone.now().date() - timedelta(days=days)
     
     # Obtener vehículos del grupo
-    vehicles = Vehicle.objects.filter(group=group)
+    vehicles = scope_queryset(Vehicle.objects.filter(group=group), request.user)
     total_vehicles = vehicles.count()
     
-    # Obtener registros en el rango
-    registers = Register.objects.filter(
-        vehicle__in=vehicles,
+    # Obtener registros en el rango (snapshot de grupo del registro, sin JOIN)
+    registers = scope_queryset(Register.objects.all(), request.user).filter(
+        group=group,
         report_date__gte=start_date
     )
     
-    total_disconnections = registers.count()
-    
-    # Contar por tipo de problema
-    route_count = registers.filter(problem__icontains='trayecto').count()
-    base_count = registers.filter(problem__icontains='base').count()
+    # Totales por clase de desconexión en una sola consulta
+    kind_counts = registers.aggregate(
+        total=Count('id'),
+        route=Count('id', filter=Q(disconnection_kind=Register.KIND_ROUTE)),
+        base=Count('id', filter=Q(disconnection_kind=Register.KIND_BASE)),
+    )
+    total_disconnections = kind_counts['total']
+    route_count = kind_counts['route']
+    base_count = kind_counts['base']
     
-    # Contar por estatus
+    # Contar por estatus (una consulta agrupada, en el orden de ESTATUS_CHOICES)
+    counts_by_status = dict(
+        registers.values_list('estatus_final').annotate(count=Count('id')).order_by()
+    )
     status_counts = {}
     for choice_value, choice_label in Register.ESTATUS_CHOICES:
-        count = registers.filter(estatus_final=choice_value).count()
+        count = counts_by_status.get(choice_value, 0)
         if count > 0:
             status_counts[choice_label] = count
     
@@ -211,32 +285,276 @@ def group_stats(request, group_id):
 @permission_classes([IsAuthenticated])
 def top_disconnected_vehicles(request):
     """
-    Vehículos con más desconexiones
+    Vehículos con más desconexiones (ver TopDisconnectedService).
+    
+    Query params:
+        limit: 1-100 (default 10)
+        days: 1-365 (default 30); 7 y 30 usan los contadores del vehículo
+    
+    Los usuarios de un distribuidor solo ven sus vehículos; el resultado se
+    cachea por (days, limit, distribuidor) hasta la siguiente carga del ETL.
     """
-    limit = int(request.query_params.get('limit', 10))
-    days = int(request.query_params.get('days', 30))
-    start_date = timezone.now().date() - timedelta(days=days)
+    try:
+        limit = int(request.query_params.get('limit', 10))
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        return Response({'error': 'limit y days deben ser enteros'}, status=400)
     
-    # Contar desconexiones por vehículo
-    top_vehicles = Vehicle.objects.filter(
-        registers__report_date__gte=start_date
-    ).annotate(
-        disconnection_count=Count('registers')
-    ).select_related('group', 'group__client').order_by('-disconnection_count')[:limit]
-    
-    vehicles_data = []
-    for vehicle in top_vehicles:
-        vehicles_data.append({
-            'vin': vehicle.vin,
-            'vehicle_id': vehicle.vehicle_id,
-            'group': vehicle.group.group_description if vehicle.group else None,
-            'client': vehicle.group.client.client_description if vehicle.group and vehicle.group.client else None,
-            'disconnection_count': vehicle.disconnection_count,
-            'last_connection': vehicle.last_connection.isoformat() if vehicle.last_connection else None
-        })
+    if not 1 <= limit <= TopDisconnectedService.MAX_LIMIT:
+        return Response({'error': f'limit debe estar entre 1 y {TopDisconnectedService.MAX_LIMIT}'}, status=400)
+    if not 1 <= days <= TopDisconnectedService.MAX_DAYS:
+        return Response({'error': f'days debe estar entre 1 y {TopDisconnectedService.MAX_DAYS}'}, status=400)
+    
+    vehicles_data = TopDisconnectedService.get_top(days, limit, get_scope(request.user))
     
     return Response({
         'period_days': days,
         'limit': limit,
         'vehicles': vehicles_data
     })
+
+
+# ============================================================================
+# SERIES DE CONECTIVIDAD (TENDENCIAS)
+# ============================================================================
+# Granularidad -> (función de truncado, días por defecto del rango).
+# Para 'day' agrupamos directo sobre report_date: ya es DateField y TruncDate
+# solo agregaría un cast de zona horaria innecesario.
+SERIES_GRANULARITIES = {
+    'day': (None, 30),
+    'week': (TruncWeek, 7 * 26),
+    'month': (TruncMonth, 365),
+}
+
+# Dimensión -> (campo llave, campo nombre). Vehicle, Register y
+# VehicleSnapshot comparten los mismos campos: los dos últimos guardan el
+# grupo y contrato que tenía el vehículo ese día.
+SERIES_DIMENSIONS = {
+    'group': ('group_id', 'group__group_description'),
+    'client': ('group__client_id', 'group__client__client_description'),
+    'contrato': ('contrato_id', 'contrato__contrato'),
+}
+
+# Número máximo de puntos por serie; por encima hay que pedir otra granularidad
+MAX_SERIES_POINTS = 400
+
+
+def _parse_date_param(request, name, default):
+    """Lee un parámetro YYYY-MM-DD; lanza ValueError si el formato es inválido"""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"Parámetro '{name}' inválido, formato esperado YYYY-MM-DD")
+
+
+def _parse_id_param(request, name):
+    """Lee un ID entero opcional; lanza ValueError si no es un entero"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Parámetro '{name}' inválido, se espera un entero")
+
+
+def _auto_granularity(start_date, end_date):
+    """Elige la granularidad para que rangos largos sigan siendo compactos"""
+    days = (end_date - start_date).days
+    if days <= 92:
+        return 'day'
+    if days <= 730:
+        return 'week'
+    return 'month'
+
+
+def _bucket_starts(start_date, end_date, granularity):
+    """Genera el inicio de cada bucket entre dos fechas (lunes para semanas)"""
+    if granularity == 'week':
+        current = start_date - timedelta(days=start_date.weekday())
+    elif granularity == 'month':
+        current = start_date.replace(day=1)
+    else:
+        current = start_date
+
+    buckets = []
+    while current <= end_date:
+        buckets.append(current)
+        if granularity == 'week':
+            current += timedelta(days=7)
+        elif granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=1)
+    return buckets
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def connectivity_series(request):
+    """
+    Series de conectividad por grupo, cliente o contrato.
+
+    Agrega los registros de desconexión en buckets de día, semana o mes
+    directamente en la base de datos y regresa un payload columnar:
+    un arreglo `dates` con el inicio de cada bucket y, por serie,
+    arreglos de conteos alineados con `dates`.
+
+    `connected` es el promedio diario de vehículos conectados en el bucket
+    según las fotos diarias (VehicleSnapshot); null si no hay fotos.
+
+    Query params:
+        start_date, end_date: Rango YYYY-MM-DD (default según granularidad)
+        granularity: day | week | month (default: automática según el rango)
+        group_by: group | client | contrato (default: group)
+        group_id, client_id: Filtros opcionales (IDs internos)
+
+    Usuarios de un distribuidor: solo sus vehículos, registros y fotos.
+    """
+    granularity = request.query_params.get('granularity')
+    if granularity and granularity not in SERIES_GRANULARITIES:
+        return Response(
+            {'error': f"granularity debe ser uno de: {', '.join(SERIES_GRANULARITIES)}"},
+            status=400
+        )
+
+    group_by = request.query_params.get('group_by', 'group')
+    if group_by not in SERIES_DIMENSIONS:
+        return Response(
+            {'error': f"group_by debe ser uno de: {', '.join(SERIES_DIMENSIONS)}"},
+            status=400
+        )
+
+    try:
+        end_date = _parse_date_param(request, 'end_date', timezone.localdate())
+        default_days = SERIES_GRANULARITIES[granularity or 'day'][1]
+        start_date = _parse_date_param(
+            request, 'start_date', end_date - timedelta(days=default_days)
+        )
+        group_id = _parse_id_param(request, 'group_id')
+        client_id = _parse_id_param(request, 'client_id')
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    if start_date > end_date:
+        return Response({'error': 'start_date debe ser menor o igual a end_date'}, status=400)
+
+    if not granularity:
+        granularity = _auto_granularity(start_date, end_date)
+
+    buckets = _bucket_starts(start_date, end_date, granularity)
+    if len(buckets) > MAX_SERIES_POINTS:
+        return Response({
+            'error': f'El rango genera {len(buckets)} puntos (máximo {MAX_SERIES_POINTS}); '
+                     f'usa una granularidad mayor'
+        }, status=400)
+
+    key_field, name_field = SERIES_DIMENSIONS[group_by]
+
+    # Total de vehículos y nombre por llave (una sola consulta agregada)
+    vehicles = scope_queryset(Vehicle.objects.all(), request.user)
+    if group_id is not None:
+        vehicles = vehicles.filter(group_id=group_id)
+    if client_id is not None:
+        vehicles = vehicles.filter(group__client_id=client_id)
+
+    totals = vehicles.values(
+        key=F(key_field), name=F(name_field)
+    ).annotate(total=Count('id')).order_by()
+
+    # Desconexiones por bucket y llave (una sola consulta agregada)
+    registers = scope_queryset(Register.objects.all(), request.user).filter(
+        report_date__range=(start_date, end_date)
+    )
+    if group_id is not None:
+        registers = registers.filter(group_id=group_id)
+    if client_id is not None:
+        registers = registers.filter(group__client_id=client_id)
+
+    trunc_function = SERIES_GRANULARITIES[granularity][0]
+    bucket_expression = trunc_function('report_date') if trunc_function else F('report_date')
+
+    aggregated = registers.annotate(bucket=bucket_expression).values(
+        'bucket', key=F(key_field)
+    ).annotate(
+        disconnected=Count('id'),
+        disconnected_vehicles=Count('vehicle_id', distinct=True),
+        route=Count('id', filter=Q(disconnection_kind=Register.KIND_ROUTE)),
+    ).order_by()
+
+    # Conectados por bucket y llave desde las fotos diarias
+    snapshots = VehicleSnapshot.objects.filter(snapshot_date__range=(start_date, end_date))
+    snapshot_bucket = trunc_function('snapshot_date') if trunc_function else F('snapshot_date')
+    snapshot_days = dict(
+        snapshots.annotate(bucket=snapshot_bucket).values_list('bucket').annotate(
+            days=Count('snapshot_date', distinct=True)
+        ).order_by()
+    )
+    snapshots = scope_queryset(snapshots, request.user, 'vehicle__distribuidor')
+    if group_id is not None:
+        snapshots = snapshots.filter(group_id=group_id)
+    if client_id is not None:
+        snapshots = snapshots.filter(group__client_id=client_id)
+
+    connected_rows = snapshots.annotate(bucket=snapshot_bucket).values(
+        'bucket', key=F(key_field)
+    ).annotate(
+        connected=Count('id', filter=Q(connected=True)),
+    ).order_by()
+
+    # Armar las series columnares
+    bucket_index = {bucket: position for position, bucket in enumerate(buckets)}
+    size = len(buckets)
+
+    series = {}
+    for row in totals:
+        series[row['key']] = {
+            'id': row['key'],
+            'name': row['name'],
+            'total': row['total'],
+            'connected': [None] * size,
+            'disconnected': [0] * size,
+            'disconnected_vehicles': [0] * size,
+            'route': [0] * size,
+            'base': [0] * size,
+        }
+
+    for row in aggregated:
+        entry = series.get(row['key'])
+        position = bucket_index.get(row['bucket'])
+        if entry is None or position is None:
+            continue
+        entry['disconnected'][position] = row['disconnected']
+        entry['disconnected_vehicles'][position] = row['disconnected_vehicles']
+        entry['route'][position] = row['route']
+        entry['base'][position] = row['disconnected'] - row['route']
+
+    # Buckets con fotos parten de 0 conectados; sin fotos quedan en null
+    snapshot_positions = [bucket_index[bucket] for bucket in snapshot_days if bucket in bucket_index]
+    for entry in series.values():
+        for position in snapshot_positions:
+            entry['connected'][position] = 0
+
+    for row in connected_rows:
+        entry = series.get(row['key'])
+        position = bucket_index.get(row['bucket'])
+        if entry is None or position is None:
+            continue
+        days = snapshot_days[row['bucket']]
+        entry['connected'][position] = row['connected'] if days == 1 else round(row['connected'] / days, 2)
+
+    for entry in series.values():
+        if entry['id'] is None and group_by == 'contrato':
+            entry['name'] = 'Sin Contrato'
+
+    return Response({
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'granularity': granularity,
+        'group_by': group_by,
+        'dates': [bucket.strftime('%Y-%m-%d') for bucket in buckets],
+        'series': sorted(series.values(), key=lambda entry: entry['name'] or ''),
+    })
@@ -0,0 +1,38 @@
+"""
+Row-Level Scoping by Distributor
+Same rule as VehicleViewSet: superusers and users without a distributor see
+the whole fleet, everyone else only the rows of their distributor. Applied
+at the queryset level so scoped users only pay for their slice.
+"""
+
+
+def get_scope(user):
+    """
+    Distributor the user is restricted to.
+
+    Returns:
+        Distribuidor pk, or None for the whole fleet
+    """
+    if user.is_superuser or not user.distribuidor_id:
+        return None
+    return user.distribuidor_id
+
+
+def scope_queryset(queryset, user, lookup='distribuidor'):
+    """
+    Filters `queryset` to the user's distributor.
+
+    Args:
+        queryset: Any queryset that reaches Distribuidor
+        user: Request user
+        lookup: Path to the distributor FK (e.g. 'vehicle__distribuidor')
+    """
+    distribuidor_id = get_scope(user)
+    if distribuidor_id is None:
+        return queryset
+    return queryset.filter(**{f'{lookup}_id': distribuidor_id})
+
+
+def scope_cache_key(distribuidor_id):
+    """Cache key part for a scope, so cached results never cross distributors"""
+    return f'd{distribuidor_id}' if distribuidor_id else 'all'
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0002_user_role'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='client',
+            name='organizatio_client__5dc113_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='distribuidor',
+            name='organizatio_distrib_76e5db_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='group',
+            name='organizatio_group_i_62f22e_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='group',
+            name='organizatio_client__424ec5_idx',
+        ),
+    ]
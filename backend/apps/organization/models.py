@@ -79,9 +79,7 @@ class Distribuidor(models.Model):
         verbose_name = 'Distribuidor'
         verbose_name_plural = 'Distribuidores'
         ordering = ['distribuidor_name']
-        indexes = [
-            models.Index(fields=['distribuidor_id']),
-        ]
+        # distribuidor_id ya es unique: no necesita un índice adicional
     
     def __str__(self):
         return f"{self.distribuidor_name} (ID: {self.distribuidor_id})"
@@ -112,9 +110,7 @@ class Client(models.Model):
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['client_description']
-        indexes = [
-            models.Index(fields=['client_id']),
-        ]
+        # client_id ya es unique: no necesita un índice adicional
     
     def __str__(self):
         return f"{self.client_description} (ID: {self.client_id})"
@@ -152,10 +148,7 @@ class Group(models.Model):
         verbose_name = 'Grupo'
         verbose_name_plural = 'Grupos'
         ordering = ['group_description']
-        indexes = [
-            models.Index(fields=['group_id']),
-            models.Index(fields=['client']),
-        ]
+        # group_id (unique) y client (FK) ya tienen su propio índice
     
     def __str__(self):
         return f"{self.group_description} (Cliente: {self.client.client_description})"
@@ -1,13 +1,38 @@
 from django.contrib import admin
-from .models import Register, Bitacora
+from .models import Register, Bitacora, RegisterArchive, BitacoraArchive
 
 @admin.register(Register)
 class RegisterAdmin(admin.ModelAdmin):
     list_display = ('vehicle', 'report_date', 'type', 'distribuidor')
-    list_filter = ('report_date', 'type', 'distribuidor')
+    list_filter = ('report_date', 'type', 'disconnection_kind', 'distribuidor')
     search_fields = ('vehicle__vin', 'problem')
 
 @admin.register(Bitacora)
 class BitacoraAdmin(admin.ModelAdmin):
     list_display = ('register', 'user', 'created_at')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+
+class ReadOnlyArchiveAdmin(admin.ModelAdmin):
+    """El archivo solo se escribe con manage.py archive_registers"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(RegisterArchive)
+class RegisterArchiveAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('id', 'vehicle_id', 'report_date', 'disconnection_kind', 'estatus_final', 'archived_at')
+    list_filter = ('disconnection_kind', 'estatus_final')
+    search_fields = ('=id', '=vehicle_id')
+    date_hierarchy = 'report_date'
+
+@admin.register(BitacoraArchive)
+class BitacoraArchiveAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('id', 'register_id', 'user_id', 'created_at', 'archived_at')
+    search_fields = ('=register_id',)
@@ -0,0 +1,154 @@
+"""
+Bitácora Audit Sink
+Buffers bitácora entries for a request or an ETL batch and writes them with
+one bulk_create once the surrounding transaction commits.
+
+    with audit_batch():
+        RegisterService.create_register(...)   # Bitacora.log_action is buffered
+
+An entry only enters the buffer through transaction.on_commit, so work that
+is rolled back never gets audited, and committed work always does: the
+buffer is flushed even if the block raises. With AUDIT_ASYNC the flush is
+handed to a background thread that retries failed writes and is drained at
+process exit.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Bitacora
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def write_entries(entries):
+    """Inserts the entries with bulk_create"""
+    Bitacora.objects.bulk_create(entries, batch_size=settings.ETL_BATCH_SIZE)
+
+
+def log_entries(entries):
+    """
+    Records bitácora entries: buffered in the active audit batch if there
+    is one, written right away (in the current transaction) otherwise.
+    """
+    sink = get_active_sink()
+    if sink is None:
+        write_entries(entries)
+        return
+    for entry in entries:
+        sink.add(entry)
+
+
+def get_active_sink():
+    """BitacoraSink of the current audit_batch() block, or None"""
+    return getattr(_local, 'sink', None)
+
+
+@contextmanager
+def audit_batch(background=None):
+    """
+    Buffers the bitácora entries logged inside the block.
+
+    Args:
+        background: Write from the background thread (default: AUDIT_ASYNC)
+    """
+    previous = get_active_sink()
+    sink = BitacoraSink(background=background)
+    _local.sink = sink
+    try:
+        yield sink
+    finally:
+        _local.sink = previous
+        sink.close()
+
+
+class BitacoraSink:
+    """Bitácora buffer flushed at transaction commit"""
+
+    def __init__(self, background=None):
+        self.background = settings.AUDIT_ASYNC if background is None else background
+        self._pending = []
+
+    def add(self, entry):
+        # Outside a transaction on_commit runs immediately; inside one the
+        # entry is dropped together with the rolled-back work
+        transaction.on_commit(lambda: self._pending.append(entry))
+
+    def close(self):
+        # on_commit callbacks run in registration order: after every add()
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        entries, self._pending = self._pending, []
+        if not entries:
+            return
+        if self.background:
+            get_writer().submit(entries)
+        else:
+            write_entries(entries)
+
+
+class BackgroundWriter:
+    """Daemon thread that writes submitted batches of bitácora entries"""
+
+    RETRIES = 3
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='bitacora-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, entries):
+        self._queue.put(entries)
+
+    def stop(self, timeout=30):
+        """Writes everything still queued and stops the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            entries = self._queue.get()
+            if entries is None:
+                break
+            self._write(entries)
+        close_old_connections()
+
+    def _write(self, entries):
+        for attempt in range(1, self.RETRIES + 1):
+            try:
+                write_entries(entries)
+                return
+            except Exception:
+                logger.warning('Bitácora: intento %s de %s fallido', attempt, self.RETRIES, exc_info=True)
+                close_old_connections()
+                time.sleep(attempt)
+        # Último recurso: las entradas quedan en el log para reprocesarlas
+        for entry in entries:
+            logger.error(
+                'Bitácora no escrita: register=%s user=%s comentario=%r',
+                entry.register_id, entry.user_id, entry.comentario
+            )
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Process-wide BackgroundWriter, started on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter()
+    return _writer
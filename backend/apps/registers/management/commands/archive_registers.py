@@ -0,0 +1,215 @@
+"""
+Retención: mueve registros y bitácora antiguos fuera de las tablas vivas
+
+    python manage.py archive_registers                     # más viejos que REGISTER_RETENTION_MONTHS
+    python manage.py archive_registers --before 2025-01-01 --dry-run
+    python manage.py archive_registers --format parquet --output-dir /data/archive
+
+Destinos:
+- table (default): RegisterArchive / BitacoraArchive (comprimidas en MySQL),
+  consultables desde el admin.
+- parquet: un archivo comprimido por lote en <output-dir>/<tabla>/ (requiere
+  pyarrow o fastparquet).
+
+Cada lote se copia y se borra en una transacción. Un registro se archiva
+junto con toda su bitácora; después se archiva la bitácora vieja de los
+registros que siguen vivos. Si la tabla está particionada por mes, las
+particiones que quedan vacías antes del corte se eliminan.
+"""
+
+from datetime import datetime, time, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.registers.models import Bitacora, BitacoraArchive, Register, RegisterArchive
+from core.cache import bump_generation
+from core.partitioning import (
+    SUPPORTED_VENDORS,
+    add_months,
+    drop_partition_sql,
+    existing_months,
+    is_partitioned,
+    month_start,
+    partition_row_count,
+)
+
+
+def _archive_columns(model, archive_model):
+    """Columnas de `model` que existen en su tabla de archivo"""
+    archived = {field.attname for field in archive_model._meta.concrete_fields}
+    return [field.attname for field in model._meta.concrete_fields if field.attname in archived]
+
+
+class TableArchive:
+    """Copia los lotes a las tablas *Archive (dentro de la transacción del lote)"""
+
+    def write(self, archive_model, rows):
+        if rows:
+            archive_model.objects.bulk_create([archive_model(**row) for row in rows])
+
+    def commit(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+class ParquetArchive:
+    """Escribe cada lote a un archivo Parquet; lo borra si el lote falla"""
+
+    def __init__(self, output_dir, run_id):
+        import pandas as pd
+
+        try:
+            pd.io.parquet.get_engine('auto')
+        except ImportError:
+            raise CommandError('--format parquet requiere pyarrow o fastparquet instalado')
+
+        self.pd = pd
+        self.output_dir = Path(output_dir)
+        self.run_id = run_id
+        self.parts = 0
+        self.pending = []
+
+    def write(self, archive_model, rows):
+        if not rows:
+            return
+        directory = self.output_dir / archive_model._meta.db_table
+        directory.mkdir(parents=True, exist_ok=True)
+        self.parts += 1
+        path = directory / f'{self.run_id}-{self.parts:05d}.parquet'
+        self.pd.DataFrame.from_records(rows).to_parquet(path, compression='gzip', index=False)
+        self.pending.append(path)
+
+    def commit(self):
+        self.pending = []
+
+    def discard(self):
+        for path in self.pending:
+            path.unlink(missing_ok=True)
+        self.pending = []
+
+
+class Command(BaseCommand):
+    help = 'Archiva (tabla o Parquet) y borra registros y bitácora anteriores al corte de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.REGISTER_RETENTION_MONTHS,
+            help='Meses completos a conservar (default: REGISTER_RETENTION_MONTHS)'
+        )
+        parser.add_argument('--before', help='Fecha de corte YYYY-MM-DD (reemplaza --months)')
+        parser.add_argument('--format', choices=['table', 'parquet'], default='table', help='Destino del archivo')
+        parser.add_argument('--output-dir', default=settings.ARCHIVE_DIR, help='Directorio para --format parquet')
+        parser.add_argument('--batch-size', type=int, default=settings.ETL_BATCH_SIZE, help='Filas por transacción')
+        parser.add_argument('--keep-partitions', action='store_true', help='No eliminar particiones vacías')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar lo que se archivaría')
+
+    def handle(self, *args, **options):
+        cutoff = self._get_cutoff(options)
+        # created_at se guarda en UTC, igual que los límites de las particiones
+        cutoff_at = datetime.combine(cutoff, time.min, tzinfo=dt_timezone.utc)
+
+        old_registers = Register.objects.filter(report_date__lt=cutoff)
+        old_entries = Bitacora.objects.filter(created_at__lt=cutoff_at)
+        self.stdout.write(f'Corte: {cutoff:%Y-%m-%d}')
+
+        if options['dry_run']:
+            self.stdout.write(f'   Registros a archivar: {old_registers.count()}')
+            self.stdout.write(f'   Bitácora a archivar: {old_entries.count()} (más la de esos registros)')
+            return
+
+        if options['format'] == 'parquet':
+            run_id = timezone.now().strftime('%Y%m%d%H%M%S')
+            sink = ParquetArchive(options['output_dir'], f'{cutoff:%Y%m%d}-{run_id}')
+        else:
+            sink = TableArchive()
+
+        registers, entries = self._archive_registers(old_registers, options['batch_size'], sink)
+        entries += self._archive_entries(old_entries, options['batch_size'], sink)
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS(f'   {registers} registros y {entries} entradas de bitácora archivados'))
+
+        if not options['keep_partitions'] and connection.vendor in SUPPORTED_VENDORS:
+            for model in (Register, Bitacora):
+                self._drop_empty_partitions(model._meta.db_table, cutoff)
+
+    def _get_cutoff(self, options):
+        if options['before']:
+            try:
+                return datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--before debe tener formato YYYY-MM-DD')
+        if options['months'] < 1:
+            raise CommandError('--months debe ser al menos 1')
+        # Meses completos: el corte cae en inicio de mes (límite de partición)
+        return add_months(month_start(timezone.now()), -options['months'])
+
+    def _archive_registers(self, queryset, batch_size, sink):
+        """Registros viejos junto con toda su bitácora, por lotes de ids"""
+        register_columns = _archive_columns(Register, RegisterArchive)
+        entry_columns = _archive_columns(Bitacora, BitacoraArchive)
+        pending = queryset.order_by('id').values_list('id', flat=True)
+        registers = entries = 0
+
+        while True:
+            ids = list(pending[:batch_size])
+            if not ids:
+                break
+            try:
+                with transaction.atomic():
+                    register_rows = list(Register.objects.filter(id__in=ids).values(*register_columns))
+                    entry_rows = list(Bitacora.objects.filter(register_id__in=ids).values(*entry_columns))
+                    sink.write(RegisterArchive, register_rows)
+                    sink.write(BitacoraArchive, entry_rows)
+                    # El CASCADE de Django borra también la bitácora del lote
+                    Register.objects.filter(id__in=ids).delete()
+            except Exception:
+                sink.discard()
+                raise
+            sink.commit()
+            registers += len(register_rows)
+            entries += len(entry_rows)
+            self.stdout.write(f'   ... {registers} registros')
+
+        return registers, entries
+
+    def _archive_entries(self, queryset, batch_size, sink):
+        """Bitácora vieja de registros que siguen vivos"""
+        entry_columns = _archive_columns(Bitacora, BitacoraArchive)
+        pending = queryset.order_by('id').values_list('id', flat=True)
+        entries = 0
+
+        while True:
+            ids = list(pending[:batch_size])
+            if not ids:
+                break
+            try:
+                with transaction.atomic():
+                    entry_rows = list(Bitacora.objects.filter(id__in=ids).values(*entry_columns))
+                    sink.write(BitacoraArchive, entry_rows)
+                    Bitacora.objects.filter(id__in=ids).delete()
+            except Exception:
+                sink.discard()
+                raise
+            sink.commit()
+            entries += len(entry_rows)
+
+        return entries
+
+    def _drop_empty_partitions(self, table, cutoff):
+        """Elimina las particiones mensuales anteriores al corte que quedaron vacías"""
+        if not is_partitioned(connection, table):
+            return
+        for month in sorted(existing_months(connection, table)):
+            if add_months(month, 1) > cutoff:
+                continue
+            if partition_row_count(connection, table, month):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(drop_partition_sql(connection, table, month))
+            self.stdout.write(f'   Partición {table} {month:%Y-%m} eliminada')
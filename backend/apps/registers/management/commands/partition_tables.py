@@ -0,0 +1,86 @@
+"""
+Particionamiento mensual por rango de registros, bitácora y fotos diarias
+
+Sin --apply solo imprime el SQL para revisarlo:
+    python manage.py partition_tables
+    python manage.py partition_tables --table registers --apply
+
+La primera vez convierte cada tabla (ver core.partitioning) y elimina las
+FKs que apuntan a ella (p. ej. Bitacora.register); después solo
+crea las particiones de los próximos meses. Correr mensualmente (cron)
+para tener siempre PARTITION_MONTHS_AHEAD meses por delante.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.partitioning import (
+    PARTITIONED_TABLES,
+    SUPPORTED_VENDORS,
+    add_months,
+    convert_table_sql,
+    create_partitions_sql,
+    get_partition_spec,
+    is_partitioned,
+    month_range,
+    month_start,
+    oldest_month,
+)
+
+
+class Command(BaseCommand):
+    help = 'Particiona por mes registers/bitacora/snapshots y crea las particiones futuras'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table', action='append', choices=sorted(PARTITIONED_TABLES),
+            help='Tabla a procesar (repetible; default: todas)'
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=getattr(settings, 'PARTITION_MONTHS_AHEAD', 3),
+            help='Meses futuros con partición propia'
+        )
+        parser.add_argument('--apply', action='store_true', help='Ejecutar el SQL (default: solo imprimirlo)')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SUPPORTED_VENDORS:
+            raise CommandError(f'Particionamiento soportado solo en PostgreSQL y MySQL (motor actual: {connection.vendor})')
+
+        current_month = month_start(timezone.now())
+        last_month = add_months(current_month, options['months_ahead'])
+
+        # En el orden de PARTITIONED_TABLES: registers se convierte antes que
+        # bitacora, que ya no recrea su FK hacia una tabla particionada
+        selected = options['table'] or PARTITIONED_TABLES
+        for alias in [alias for alias in PARTITIONED_TABLES if alias in selected]:
+            model, column = get_partition_spec(alias)
+            table = model._meta.db_table
+
+            if is_partitioned(connection, table):
+                months = list(month_range(current_month, last_month))
+                statements = create_partitions_sql(connection, model, column, months)
+                action = 'particiones nuevas'
+            else:
+                months = list(month_range(oldest_month(model, column) or current_month, last_month))
+                statements = convert_table_sql(connection, model, column, months)
+                action = f'conversión a tabla particionada ({len(months)} meses)'
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {table}: {action}'))
+            if not statements:
+                self.stdout.write('   Nada que hacer')
+                continue
+            for statement in statements:
+                self.stdout.write(f'{statement};')
+
+            if options['apply']:
+                # PostgreSQL aplica la conversión completa en una transacción;
+                # en MySQL el DDL hace commit implícito sentencia por sentencia
+                with transaction.atomic(), connection.cursor() as cursor:
+                    for statement in statements:
+                        cursor.execute(statement)
+                self.stdout.write(self.style.SUCCESS(f'   {len(statements)} sentencias aplicadas'))
+
+        if not options['apply']:
+            self.stdout.write(self.style.WARNING('Solo vista previa: usa --apply para ejecutar'))
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('registers', '0002_register_estatus_final_register_responsable_and_more'),
+        ('vehicles', '0003_index_audit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Primero los compuestos: en MySQL la FK necesita en todo momento un
+        # índice que empiece con su columna antes de soltar el índice simple.
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['report_date', 'vehicle'], name='registers_r_report__c1bd99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['distribuidor', 'report_date'], name='registers_r_distrib_23893d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['estatus_final', 'report_date'], name='registers_r_estatus_248261_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='register',
+            name='registers_r_report__96a3bb_idx',
+        ),
+        migrations.AlterField(
+            model_name='bitacora',
+            name='register',
+            field=models.ForeignKey(db_index=False, help_text='Registro asociado', on_delete=django.db.models.deletion.CASCADE, related_name='bitacora_entries', to='registers.register'),
+        ),
+        migrations.AlterField(
+            model_name='bitacora',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Usuario que realizó la acción', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bitacora_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='register',
+            name='distribuidor',
+            field=models.ForeignKey(db_index=False, help_text='Distribuidor asociado en el momento del evento', on_delete=django.db.models.deletion.PROTECT, related_name='registers', to='organization.distribuidor'),
+        ),
+        migrations.AlterField(
+            model_name='register',
+            name='report_date',
+            field=models.DateField(auto_now_add=True, help_text='Fecha cuando se registró la desconexión'),
+        ),
+        migrations.AlterField(
+            model_name='register',
+            name='vehicle',
+            field=models.ForeignKey(db_index=False, help_text='Vehículo asociado al registro', on_delete=django.db.models.deletion.CASCADE, related_name='registers', to='vehicles.vehicle'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_group_contrato(apps, schema_editor):
+    """Copia el grupo/contrato actual del vehículo a los registros existentes"""
+    Register = apps.get_model('registers', 'Register')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+
+    vehicle = Vehicle.objects.filter(pk=OuterRef('vehicle_id'))
+    Register.objects.filter(group__isnull=True).update(
+        group_id=Subquery(vehicle.values('group_id')[:1]),
+        contrato_id=Subquery(vehicle.values('contrato_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('registers', '0003_index_audit'),
+        ('vehicles', '0003_index_audit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='register',
+            name='contrato',
+            field=models.ForeignKey(blank=True, help_text='Contrato del vehículo en el momento del evento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registers', to='vehicles.contrato'),
+        ),
+        migrations.AddField(
+            model_name='register',
+            name='group',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Grupo del vehículo en el momento del evento', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registers', to='organization.group'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['report_date', 'group', 'contrato'], name='registers_r_report__a8c48c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['group', 'report_date'], name='registers_r_group_i_00a82a_idx'),
+        ),
+        migrations.RunPython(backfill_group_contrato, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def backfill_disconnection_kind(apps, schema_editor):
+    """Clasifica los registros existentes según el texto de problem"""
+    Register = apps.get_model('registers', 'Register')
+
+    # Mismo orden que Register.kind_from_problem: 'trayecto' gana sobre 'base'
+    Register.objects.filter(problem__icontains='trayecto').update(disconnection_kind=1)
+    Register.objects.filter(disconnection_kind=0, problem__icontains='base').update(disconnection_kind=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('registers', '0004_register_group_contrato_snapshot'),
+        ('vehicles', '0003_index_audit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='register',
+            name='disconnection_kind',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Desconocida'), (1, 'Trayecto'), (2, 'Base')], default=0, help_text='Clase de desconexión: trayecto, base o desconocida'),
+        ),
+        # Backfill antes de crear los índices que incluyen la columna
+        migrations.RunPython(backfill_disconnection_kind, migrations.RunPython.noop),
+        # Primero los nuevos índices: en MySQL la FK de group necesita en todo
+        # momento un índice que empiece con su columna.
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['report_date', 'group', 'contrato', 'disconnection_kind'], name='registers_r_report__a9610c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['group', 'report_date', 'disconnection_kind'], name='registers_r_group_i_8b7dd4_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='register',
+            name='registers_r_report__a8c48c_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='register',
+            name='registers_r_group_i_00a82a_idx',
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+ARCHIVE_TABLES = ('registers_registerarchive', 'registers_bitacoraarchive')
+
+
+def compress_archive_tables(apps, schema_editor):
+    """En MySQL las tablas de archivo se guardan comprimidas (InnoDB)"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table in ARCHIVE_TABLES:
+        schema_editor.execute(f'ALTER TABLE {schema_editor.quote_name(table)} ROW_FORMAT=COMPRESSED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0005_register_disconnection_kind'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bitacora',
+            name='register',
+            field=models.ForeignKey(db_constraint=False, db_index=False, help_text='Registro asociado', on_delete=django.db.models.deletion.CASCADE, related_name='bitacora_entries', to='registers.register'),
+        ),
+        migrations.CreateModel(
+            name='BitacoraArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('register_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('comentario', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Bitácora Archivada',
+                'verbose_name_plural': 'Bitácoras Archivadas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['register_id', 'created_at'], name='registers_b_registe_8efccb_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RegisterArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('vehicle_id', models.BigIntegerField()),
+                ('report_date', models.DateField()),
+                ('platform_client', models.CharField(blank=True, max_length=100)),
+                ('distribuidor_id', models.BigIntegerField()),
+                ('group_id', models.BigIntegerField(blank=True, null=True)),
+                ('contrato_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_connection', models.DateTimeField()),
+                ('problem', models.CharField(blank=True, max_length=255)),
+                ('type', models.CharField(blank=True, max_length=50)),
+                ('last_status', models.CharField(blank=True, max_length=50)),
+                ('comentario', models.TextField(blank=True)),
+                ('disconnection_kind', models.PositiveSmallIntegerField(choices=[(0, 'Desconocida'), (1, 'Trayecto'), (2, 'Base')])),
+                ('tipo', models.CharField(choices=[('MAL FUNCIONAMIENTO', 'Mal Funcionamiento'), ('OPERACIÓN', 'Operación')], max_length=50)),
+                ('estatus_final', models.CharField(blank=True, choices=[('POSIBLE MANIPULACIÓN', 'Posible Manipulación'), ('PERDIDA DE SEÑAL', 'Perdida de Señal'), ('TALLER', 'Taller'), ('CORTACORRIENTE', 'Cortacorriente'), ('BASE', 'Base'), ('ACCIDENTADA', 'Accidentada')], max_length=50)),
+                ('responsable', models.CharField(choices=[('SIN ESTATUS DEL DISTRIBUIDOR', 'Sin Estatus del Distribuidor'), ('SIN ESTATUS DEL CLIENTE', 'Sin Estatus del Cliente'), ('NO OPERACIONAL', 'No Operacional'), ('REVISIÓN FÍSICA', 'Revisión Física')], max_length=50)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Registro Archivado',
+                'verbose_name_plural': 'Registros Archivados',
+                'ordering': ['-report_date', '-id'],
+                'indexes': [models.Index(fields=['report_date', 'vehicle_id'], name='registers_r_report__3d69ff_idx'), models.Index(fields=['vehicle_id', 'report_date'], name='registers_r_vehicle_9c628c_idx')],
+            },
+        ),
+        migrations.RunPython(compress_archive_tables, migrations.RunPython.noop),
+    ]
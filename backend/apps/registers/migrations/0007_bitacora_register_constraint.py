@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.partitioning import SUPPORTED_VENDORS, is_partitioned
+
+
+class AlterRegisterConstraint(migrations.AlterField):
+    """
+    Recrea la FK bitacora -> register, salvo que registers_register ya esté
+    particionada: la FK necesitaría incluir report_date (ver partition_tables)
+    """
+
+    def _register_partitioned(self, schema_editor):
+        connection = schema_editor.connection
+        return connection.vendor in SUPPORTED_VENDORS and is_partitioned(connection, 'registers_register')
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._register_partitioned(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._register_partitioned(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registers', '0006_register_archive'),
+    ]
+
+    operations = [
+        AlterRegisterConstraint(
+            model_name='bitacora',
+            name='register',
+            field=models.ForeignKey(db_index=False, help_text='Registro asociado', on_delete=django.db.models.deletion.CASCADE, related_name='bitacora_entries', to='registers.register'),
+        ),
+    ]
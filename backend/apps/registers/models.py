@@ -2,15 +2,36 @@
 
 """
 Registers Models - Gestión de registros de desconexiones y bitácora
-Tablas: Register, Bitacora
+Tablas: Register, Bitacora, RegisterArchive, BitacoraArchive
 """
 
 from django.db import models
+from django.db.models import F
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+# REGISTER QUERYSET
+# ============================================================================
+class RegisterQuerySet(models.QuerySet):
+    """
+    QuerySet de registros con helpers de lectura.
+    """
+    
+    def with_vehicle_details(self):
+        """
+        Trae el vehículo y anota en SQL los nombres de distribuidor y cliente
+        que expone RegisterSerializer, para que un listado cueste un número
+        constante de consultas sin importar el tamaño de página.
+        """
+        return self.select_related('vehicle').annotate(
+            vehicle_distribuidor_name=F('vehicle__distribuidor__distribuidor_name'),
+            vehicle_client_description=F('vehicle__group__client__client_description'),
+        )
+
+
 # ============================================================================
 # REGISTER MODEL
 # ============================================================================
@@ -55,19 +76,30 @@ class Register(models.Model):
         (RESPONSABLE_REVISION_FISICA, 'Revisión Física'),
     ]
     
+    # Clase de desconexión normalizada (derivada de problem al crear)
+    KIND_UNKNOWN = 0
+    KIND_ROUTE = 1
+    KIND_BASE = 2
+    KIND_CHOICES = [
+        (KIND_UNKNOWN, 'Desconocida'),
+        (KIND_ROUTE, 'Trayecto'),
+        (KIND_BASE, 'Base'),
+    ]
+    
     # Identificador y relación
+    # vehicle y report_date se indexan en los compuestos de Meta.indexes
     vehicle = models.ForeignKey(
         'vehicles.Vehicle',
         on_delete=models.CASCADE,
         related_name='registers',
+        db_index=False,
         help_text='Vehículo asociado al registro'
     )
     
     # Fecha de análisis/reporte
     report_date = models.DateField(
         auto_now_add=True,
-        help_text='Fecha cuando se registró la desconexión',
-        db_index=True
+        help_text='Fecha cuando se registró la desconexión'
     )
     
     # Información del evento
@@ -80,9 +112,31 @@ class Register(models.Model):
         'organization.Distribuidor',
         on_delete=models.PROTECT,
         related_name='registers',
+        db_index=False,
         help_text='Distribuidor asociado en el momento del evento'
     )
     
+    # Snapshot del grupo/contrato del vehículo al crear el registro:
+    # analytics agrega sin JOIN a vehicles y los reportes históricos no
+    # cambian si después el vehículo se mueve de grupo o contrato
+    group = models.ForeignKey(
+        'organization.Group',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='registers',
+        db_index=False,
+        help_text='Grupo del vehículo en el momento del evento'
+    )
+    contrato = models.ForeignKey(
+        'vehicles.Contrato',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='registers',
+        help_text='Contrato del vehículo en el momento del evento'
+    )
+    
     # Datos de la desconexión
     last_connection = models.DateTimeField(
         help_text='Última conexión registrada del vehículo'
@@ -106,6 +160,11 @@ class Register(models.Model):
         blank=True,
         help_text='Comentarios adicionales'
     )
+    disconnection_kind = models.PositiveSmallIntegerField(
+        choices=KIND_CHOICES,
+        default=KIND_UNKNOWN,
+        help_text='Clase de desconexión: trayecto, base o desconocida'
+    )
     
     # Campos editables por usuario
     tipo = models.CharField(
@@ -131,18 +190,44 @@ class Register(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RegisterQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Registro de Desconexión'
         verbose_name_plural = 'Registros de Desconexión'
         ordering = ['-report_date', '-created_at']
+        # (report_date, vehicle): rangos de fecha de analytics + JOIN al vehículo
+        # (vehicle, report_date): historial y "ya existe registro hoy" del ETL
+        # (distribuidor, report_date): listados por distribuidor
+        # (estatus_final, report_date): filtros y conteos por estatus
+        # (report_date, group, contrato, disconnection_kind): matriz/series
+        # sin JOIN a vehicles, resueltas solo con el índice
+        # (group, report_date, disconnection_kind): estadísticas de un grupo
         indexes = [
+            models.Index(fields=['report_date', 'vehicle']),
+            models.Index(fields=['report_date', 'group', 'contrato', 'disconnection_kind']),
+            models.Index(fields=['group', 'report_date', 'disconnection_kind']),
             models.Index(fields=['vehicle', 'report_date']),
-            models.Index(fields=['report_date']),
+            models.Index(fields=['distribuidor', 'report_date']),
+            models.Index(fields=['estatus_final', 'report_date']),
             models.Index(fields=['last_status']),
         ]
     
     def __str__(self):
         return f"Registro {self.vehicle.vin[:8]}... ({self.report_date})"
+    
+    @classmethod
+    def kind_from_problem(cls, problem: str) -> int:
+        """
+        Clasifica el texto de problem generado por el ETL
+        ("Desconexión en trayecto" / "Desconexión en base").
+        """
+        problem = (problem or '').lower()
+        if 'trayecto' in problem:
+            return cls.KIND_ROUTE
+        if 'base' in problem:
+            return cls.KIND_BASE
+        return cls.KIND_UNKNOWN
 
 
 # ============================================================================
@@ -157,10 +242,15 @@ class Bitacora(models.Model):
     """
     
     # Relación con Register
+    # register y user se indexan en los compuestos de Meta.indexes.
+    # Si registers_register se particiona por mes, partition_tables elimina
+    # esta FK en la base (necesitaría incluir report_date); el CASCADE lo
+    # sigue aplicando Django.
     register = models.ForeignKey(
         Register,
         on_delete=models.CASCADE,
         related_name='bitacora_entries',
+        db_index=False,
         help_text='Registro asociado'
     )
     
@@ -171,6 +261,7 @@ class Bitacora(models.Model):
         null=True,
         blank=True,
         related_name='bitacora_entries',
+        db_index=False,
         help_text='Usuario que realizó la acción'
     )
     
@@ -193,23 +284,100 @@ class Bitacora(models.Model):
         ]
     
     def __str__(self):
-        return f"Bitácora {self.register.id} por {self.user} ({self.created_at})"
+        return f"Bitácora {self.register_id} por {self.user} ({self.created_at})"
     
     @staticmethod
     def log_action(register: Register, user: 'organization.User' = None, 
                    comentario: str = ''):
         """
         Crear una entrada en la bitácora.
+        Dentro de un bloque audit_batch() la entrada se acumula y se escribe
+        con el resto del lote al confirmar la transacción (ver audit.py).
         
         Args:
             register: Registro asociado
             user: Usuario que realizó la acción (opcional)
             comentario: Comentario adicional
         """
-        bitacora = Bitacora.objects.create(
+        from .audit import get_active_sink
+        
+        bitacora = Bitacora(
             register=register,
             user=user,
             comentario=comentario
         )
-        logger.info(f"Bitácora creada: {bitacora}")
+        sink = get_active_sink()
+        if sink is not None:
+            sink.add(bitacora)
+            return bitacora
+        
+        bitacora.save()
+        logger.debug('Bitácora creada para registro %s', bitacora.register_id)
         return bitacora
+
+
+# ============================================================================
+# ARCHIVE MODELS
+# ============================================================================
+class RegisterArchive(models.Model):
+    """
+    Registro archivado por `manage.py archive_registers`.
+    Copia plana de Register (mismo id, llaves como enteros sin FK) para que
+    el histórico siga consultable sin pesar en la tabla viva.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    vehicle_id = models.BigIntegerField()
+    report_date = models.DateField()
+    platform_client = models.CharField(max_length=100, blank=True)
+    distribuidor_id = models.BigIntegerField()
+    group_id = models.BigIntegerField(null=True, blank=True)
+    contrato_id = models.BigIntegerField(null=True, blank=True)
+    last_connection = models.DateTimeField()
+    problem = models.CharField(max_length=255, blank=True)
+    type = models.CharField(max_length=50, blank=True)
+    last_status = models.CharField(max_length=50, blank=True)
+    comentario = models.TextField(blank=True)
+    disconnection_kind = models.PositiveSmallIntegerField(choices=Register.KIND_CHOICES)
+    tipo = models.CharField(max_length=50, choices=Register.TIPO_CHOICES)
+    estatus_final = models.CharField(max_length=50, choices=Register.ESTATUS_CHOICES, blank=True)
+    responsable = models.CharField(max_length=50, choices=Register.RESPONSABLE_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Registro Archivado'
+        verbose_name_plural = 'Registros Archivados'
+        ordering = ['-report_date', '-id']
+        indexes = [
+            models.Index(fields=['report_date', 'vehicle_id']),
+            models.Index(fields=['vehicle_id', 'report_date']),
+        ]
+    
+    def __str__(self):
+        return f"Registro archivado {self.id} ({self.report_date})"
+
+
+class BitacoraArchive(models.Model):
+    """
+    Entrada de bitácora archivada junto con su registro o por antigüedad.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    register_id = models.BigIntegerField()
+    user_id = models.BigIntegerField(null=True, blank=True)
+    comentario = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Bitácora Archivada'
+        verbose_name_plural = 'Bitácoras Archivadas'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['register_id', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Bitácora archivada {self.id} del registro {self.register_id}"
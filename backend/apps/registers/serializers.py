@@ -36,10 +36,16 @@ class RegisterSerializer(serializers.ModelSerializer):
             'last_connection', 'problem', 
             'tipo', 'estatus_final', 'responsable', 'comentario'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'report_date']
+        # disconnection_kind se deriva de problem en el ViewSet, nunca del cliente
+        read_only_fields = ['created_at', 'updated_at', 'report_date', 'disconnection_kind']
 
+    # Los listados usan Register.objects.with_vehicle_details(), que ya trae
+    # estos datos anotados; el recorrido de relaciones queda solo como
+    # respaldo para instancias sueltas (ej. la respuesta de un create).
     def get_distribuidor_name(self, obj):
         """Obtener nombre del distribuidor desde el vehículo"""
+        if hasattr(obj, 'vehicle_distribuidor_name'):
+            return obj.vehicle_distribuidor_name
         try:
             if obj.vehicle and obj.vehicle.distribuidor:
                 return obj.vehicle.distribuidor.distribuidor_name
@@ -49,6 +55,8 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def get_client_description(self, obj):
         """Obtener descripción del cliente desde el grupo del vehículo"""
+        if hasattr(obj, 'vehicle_client_description'):
+            return obj.vehicle_client_description
         try:
             if obj.vehicle and obj.vehicle.group and obj.vehicle.group.client:
                 return obj.vehicle.group.client.client_description
@@ -59,6 +67,6 @@ class RegisterSerializer(serializers.ModelSerializer):
     def get_contrato(self, obj):
         """Verificar si el vehículo tiene contrato"""
         try:
-            return "SÍ" if getattr(obj.vehicle, 'contrato', None) else "NO"
+            return "SÍ" if getattr(obj.vehicle, 'contrato_id', None) else "NO"
         except:
             return "NO"
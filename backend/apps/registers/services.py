@@ -4,11 +4,13 @@ Business logic for register management and disconnection detection
 """
 
 from typing import List, Dict, Any, Optional
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
 import logging
 
+from .audit import audit_batch, log_entries
 from .models import Register, Bitacora
 from apps.vehicles.models import Vehicle
 from apps.organization.models import Distribuidor
@@ -21,6 +23,12 @@ class RegisterService:
     Service for managing disconnection registers and audit trail
     """
     
+    # Fields update_register / bulk_update_registers may change
+    EDITABLE_FIELDS = [
+        'problem', 'type', 'last_status', 'comentario',
+        'tipo', 'estatus_final', 'responsable',
+    ]
+    
     @staticmethod
     def create_register(
         vehicle: Vehicle,
@@ -31,7 +39,8 @@ class RegisterService:
         problem: str = '',
         type_: str = '',
         last_status: str = '',
-        comentario: str = ''
+        comentario: str = '',
+        disconnection_kind: Optional[int] = None
     ) -> Register:
         """
         Create a new disconnection register.
@@ -46,6 +55,7 @@ class RegisterService:
             type_: Disconnection type
             last_status: Last known status
             comentario: Additional comments
+            disconnection_kind: Register.KIND_* value (derived from problem if omitted)
             
         Returns:
             Created Register instance
@@ -55,8 +65,13 @@ class RegisterService:
             report_date=report_date,
             platform_client=platform_client,
             distribuidor=distribuidor,
+            group_id=vehicle.group_id,
+            contrato_id=vehicle.contrato_id,
             last_connection=last_connection,
             problem=problem,
+            disconnection_kind=(
+                Register.kind_from_problem(problem) if disconnection_kind is None else disconnection_kind
+            ),
             type=type_,
             last_status=last_status,
             comentario=comentario
@@ -68,7 +83,7 @@ class RegisterService:
             comentario=f'Registro creado: {problem}'
         )
         
-        logger.info(f"Register created: {register}")
+        logger.debug('Register created: %s', register)
         return register
     
     @staticmethod
@@ -81,37 +96,109 @@ class RegisterService:
         
         Args:
             register: Register instance to update
-            **kwargs: Fields to update (problem, type, last_status, comentario)
+            **kwargs: Fields to update (see EDITABLE_FIELDS)
             
         Returns:
             Updated Register instance
         """
-        changes = {}
-        
-        for field, value in kwargs.items():
-            if field in ['problem', 'type', 'last_status', 'comentario']:
-                old_value = getattr(register, field, None)
-                if old_value != value:
-                    changes[field] = (old_value, value)
-                    setattr(register, field, value)
+        changes = RegisterService._apply_changes(register, kwargs)
         
         if changes:
             register.save()
             
             # Log changes to bitacora
-            change_summary = ', '.join([
-                f'{field}: "{old}" → "{new}"' 
-                for field, (old, new) in changes.items()
-            ])
             Bitacora.log_action(
                 register=register,
-                comentario=f'Actualizado: {change_summary}'
+                comentario=RegisterService._change_summary(changes)
             )
             
-            logger.info(f"Register updated: {register}")
+            logger.debug('Register updated: %s', register)
         
         return register
     
+    @staticmethod
+    def bulk_update_registers(
+        registers,
+        user=None,
+        **kwargs
+    ) -> List[Register]:
+        """
+        Apply the same change set to many registers with update_register's
+        audit semantics: only rows that actually change are written, each
+        with its own Bitacora entry listing its old → new values.
+        
+        One bulk_update and one Bitacora bulk_create, in a single
+        transaction with the rows locked.
+        
+        Args:
+            registers: QuerySet of Register instances to update
+            user: User recorded in the bitácora (optional)
+            **kwargs: Fields to update (see EDITABLE_FIELDS)
+            
+        Returns:
+            List of the Register instances that changed
+        """
+        with transaction.atomic():
+            updated = []
+            entries = []
+            changed_fields = set()
+            now = timezone.now()
+            
+            for register in registers.select_for_update().order_by('id'):
+                changes = RegisterService._apply_changes(register, kwargs)
+                if not changes:
+                    continue
+                register.updated_at = now
+                changed_fields.update(changes)
+                updated.append(register)
+                entries.append(Bitacora(
+                    register=register,
+                    user=user,
+                    comentario=RegisterService._change_summary(changes)
+                ))
+            
+            if updated:
+                if 'problem' in changed_fields:
+                    changed_fields.add('disconnection_kind')
+                Register.objects.bulk_update(
+                    updated, sorted(changed_fields | {'updated_at'}), batch_size=settings.ETL_BATCH_SIZE
+                )
+                log_entries(entries)
+        
+        logger.info('%s registers updated in bulk', len(updated))
+        return updated
+    
+    @staticmethod
+    def _apply_changes(register: Register, values: Dict[str, Any]) -> Dict[str, tuple]:
+        """
+        Sets the editable values that differ on `register`.
+        
+        Returns:
+            {field: (old, new)} for the fields that changed
+        """
+        changes = {}
+        
+        for field, value in values.items():
+            if field in RegisterService.EDITABLE_FIELDS:
+                old_value = getattr(register, field, None)
+                if old_value != value:
+                    changes[field] = (old_value, value)
+                    setattr(register, field, value)
+        
+        if 'problem' in changes:
+            register.disconnection_kind = Register.kind_from_problem(register.problem)
+        
+        return changes
+    
+    @staticmethod
+    def _change_summary(changes: Dict[str, tuple]) -> str:
+        """Bitácora text for a set of changes"""
+        change_summary = ', '.join([
+            f'{field}: "{old}" → "{new}"' 
+            for field, (old, new) in changes.items()
+        ])
+        return f'Actualizado: {change_summary}'
+    
     @staticmethod
     def get_recent_disconnections(days: int = 7):
         """
@@ -159,40 +246,143 @@ class RegisterService:
         new_registers = []
         threshold_minutes = 5  # Consider disconnected if no contact for 5+ minutes
         
-        for vehicle_data in vehicles_data:
-            try:
-                vehicle_id = vehicle_data.get('vehicle_id')
-                vehicle = Vehicle.objects.get(vehicle_id=vehicle_id)
+        # Bitacora entries of the whole batch go in one bulk_create at the end
+        with audit_batch():
+            for vehicle_data in vehicles_data:
+                try:
+                    vehicle_id = vehicle_data.get('vehicle_id')
+                    vehicle = Vehicle.objects.get(vehicle_id=vehicle_id)
                 
-                # Check if vehicle is disconnected
-                status = vehicle_data.get('status', 0)
-                last_comm = vehicle_data.get('last_communication_time')
+                    # Check if vehicle is disconnected
+                    status = vehicle_data.get('status', 0)
+                    last_comm = vehicle_data.get('last_communication_time')
                 
-                if status == 0 or (last_comm and RegisterService._is_old_connection(last_comm, threshold_minutes)):
-                    # Create register for disconnection
-                    parsed_datetime = RegisterService._parse_datetime(last_comm)
-                    register = RegisterService.create_register(
-                        vehicle=vehicle,
-                        report_date=timezone.now().date(),
-                        platform_client=vehicle_data.get('client_name', ''),
-                        distribuidor=vehicle.distribuidor,
-                        last_connection=parsed_datetime or timezone.now(),
-                        problem=f'Desconexión de vehículo - Status: {status}',
-                        type_='DESCONEXION',
-                        last_status=str(status),
-                        comentario=f'Detected at {timezone.now().isoformat()}'
-                    )
-                    new_registers.append(register)
+                    if status == 0 or (last_comm and RegisterService._is_old_connection(last_comm, threshold_minutes)):
+                        # Create register for disconnection
+                        parsed_datetime = RegisterService._parse_datetime(last_comm)
+                        register = RegisterService.create_register(
+                            vehicle=vehicle,
+                            report_date=timezone.now().date(),
+                            platform_client=vehicle_data.get('client_name', ''),
+                            distribuidor=vehicle.distribuidor,
+                            last_connection=parsed_datetime or timezone.now(),
+                            problem=f'Desconexión de vehículo - Status: {status}',
+                            type_='DESCONEXION',
+                            last_status=str(status),
+                            comentario=f'Detected at {timezone.now().isoformat()}'
+                        )
+                        new_registers.append(register)
             
-            except Vehicle.DoesNotExist:
-                logger.warning(f"Vehicle {vehicle_data.get('vehicle_id')} not found")
-                continue
-            except Exception as e:
-                logger.error(f"Error detecting disconnection for vehicle {vehicle_data.get('vehicle_id')}: {str(e)}")
-                continue
+                except Vehicle.DoesNotExist:
+                    logger.warning('Vehicle %s not found', vehicle_data.get('vehicle_id'))
+                    continue
+                except Exception as e:
+                    logger.error('Error detecting disconnection for vehicle %s: %s', vehicle_data.get('vehicle_id'), e)
+                    continue
         
         return new_registers
-    
+
+    @staticmethod
+    def detect_disconnections_batch(
+        vehicles_data: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> List[Register]:
+        """
+        Batched variant of detect_disconnections (same rule and same fields).
+
+        Vehicles are resolved with in_bulk on vehicle_id, and registers and
+        their creation Bitacora entries are written with bulk_create: a
+        handful of queries per batch instead of three per row.
+
+        Args:
+            vehicles_data: List of vehicle data from endpoint
+            batch_size: Rows per query (default: ETL_BATCH_SIZE)
+
+        Returns:
+            List of newly created Register instances
+        """
+        batch_size = batch_size or settings.ETL_BATCH_SIZE
+        new_registers = []
+        for start in range(0, len(vehicles_data), batch_size):
+            new_registers.extend(
+                RegisterService._detect_batch(vehicles_data[start:start + batch_size])
+            )
+        return new_registers
+
+    @staticmethod
+    def _detect_batch(vehicles_data: List[Dict[str, Any]]) -> List[Register]:
+        threshold = timedelta(minutes=5)  # Consider disconnected if no contact for 5+ minutes
+        now = timezone.now()
+        # One marker per batch: also used to read back ids where the
+        # database doesn't return them from bulk_create (MySQL)
+        detected_comment = f'Detected at {now.isoformat()}'
+
+        vehicle_ids = {vehicle_data.get('vehicle_id') for vehicle_data in vehicles_data}
+        vehicles = Vehicle.objects.only(
+            'id', 'vehicle_id', 'group_id', 'contrato_id', 'distribuidor_id'
+        ).in_bulk([vehicle_id for vehicle_id in vehicle_ids if vehicle_id is not None], field_name='vehicle_id')
+
+        registers = []
+        for vehicle_data in vehicles_data:
+            vehicle = vehicles.get(vehicle_data.get('vehicle_id'))
+            if vehicle is None:
+                logger.warning('Vehicle %s not found', vehicle_data.get('vehicle_id'))
+                continue
+
+            status = vehicle_data.get('status', 0)
+            last_comm = vehicle_data.get('last_communication_time')
+            parsed_datetime = RegisterService._parse_datetime(last_comm)
+            # Same as _is_old_connection: an unparseable timestamp counts as old
+            is_old = bool(last_comm) and (parsed_datetime is None or now - parsed_datetime > threshold)
+            if status != 0 and not is_old:
+                continue
+
+            problem = f'Desconexión de vehículo - Status: {status}'
+            registers.append(Register(
+                vehicle=vehicle,
+                report_date=timezone.localdate(now),
+                platform_client=vehicle_data.get('client_name', ''),
+                distribuidor_id=vehicle.distribuidor_id,
+                group_id=vehicle.group_id,
+                contrato_id=vehicle.contrato_id,
+                last_connection=parsed_datetime or now,
+                problem=problem,
+                disconnection_kind=Register.kind_from_problem(problem),
+                type='DESCONEXION',
+                last_status=str(status),
+                comentario=detected_comment
+            ))
+
+        if not registers:
+            return []
+
+        with transaction.atomic():
+            Register.objects.bulk_create(registers)
+            if registers[0].pk is None:
+                # By marker alone: report_date is auto_now_add, so the stored
+                # date may not match one computed here
+                ids = dict(
+                    Register.objects.filter(comentario=detected_comment)
+                    .order_by('id').values_list('id', 'vehicle_id')
+                )
+                RegisterService._assign_ids(registers, ids)
+            log_entries([
+                Bitacora(register=register, comentario=f'Registro creado: {register.problem}')
+                for register in registers
+            ])
+
+        logger.info('%s registers created from %s vehicles', len(registers), len(vehicles_data))
+        return registers
+
+    @staticmethod
+    def _assign_ids(registers: List[Register], ids: Dict[int, int]) -> None:
+        """Sets the pk read back for each register (ids in insertion order)"""
+        pending = {}
+        for register_id, vehicle_id in ids.items():
+            pending.setdefault(vehicle_id, []).append(register_id)
+        for register in registers:
+            register.pk = pending[register.vehicle_id].pop(0)
+
     @staticmethod
     def _is_old_connection(last_comm_str: Optional[str], threshold_minutes: int) -> bool:
         """
@@ -4,9 +4,11 @@ Registers App URLs
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterViewSet
+from .views import RegisterViewSet, BitacoraViewSet
 
 router = DefaultRouter()
+# 'bitacora' va primero para que la ruta de detalle de registros no la capture
+router.register(r'bitacora', BitacoraViewSet, basename='bitacora')
 # Usar '' en lugar de 'registers' porque la URL padre ya incluye 'registers/'
 router.register(r'', RegisterViewSet, basename='register')
 
@@ -3,61 +3,328 @@ Views for Registers App
 Handles Register and Bitacora endpoints
 """
 
+import csv
+import tempfile
+from datetime import datetime, timedelta
+
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db.models import Count, F
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
+from apps.authentication.scoping import scope_queryset
 from .models import Register, Bitacora
 from .serializers import RegisterSerializer, BitacoraSerializer # Importamos SOLO lo que existe
+from .services import RegisterService
+from core.renderers import FastJSONRenderer
+from core.pagination import (
+    KeysetPaginationMixin,
+    RegisterKeysetPagination,
+    BitacoraKeysetPagination,
+)
+
+# Columnas de la exportación: los mismos campos aplanados de RegisterSerializer
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('report_date', 'report_date'),
+    ('vin', F('vehicle__vin')),
+    ('vehicle_id', F('vehicle__vehicle_id')),
+    ('client_description', F('vehicle_client_description')),
+    ('distribuidor_name', F('vehicle_distribuidor_name')),
+    ('contrato', F('vehicle__contrato_id')),
+    ('last_connection', 'last_connection'),
+    ('problem', 'problem'),
+    ('tipo', 'tipo'),
+    ('estatus_final', 'estatus_final'),
+    ('responsable', 'responsable'),
+    ('comentario', 'comentario'),
+]
+
+
+# Dimensiones de by_status -> campo de Register
+STATUS_DIMENSIONS = {
+    'estatus_final': 'estatus_final',
+    'responsable': 'responsable',
+    'tipo': 'tipo',
+    'kind': 'disconnection_kind',
+}
+
+# Máximo de registros por llamada a bulk-update
+BULK_UPDATE_MAX_IDS = 1000
+
+
+class _EchoBuffer:
+    """Pseudo-buffer para csv.writer: regresa la línea en vez de guardarla"""
+    
+    def write(self, value):
+        return value
+
+
+def _parse_date(value):
+    """YYYY-MM-DD -> date (None si viene vacío); ValueError si es inválido"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+# Texto que Excel interpreta como fórmula (inyección CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _export_value(value):
+    """
+    Formatea un valor para CSV/XLSX (fechas en hora local). El texto que
+    empieza como fórmula se antecede con ' para que Excel lo muestre tal cual.
+    """
+    if value is None:
+        return ''
+    if hasattr(value, 'tzinfo') and hasattr(value, 'hour'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
 
-class BitacoraViewSet(viewsets.ReadOnlyModelViewSet):
+class BitacoraViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     """
     Vista de solo lectura para la auditoría.
+    Solo la bitácora de los registros del distribuidor del usuario.
     """
     queryset = Bitacora.objects.all().select_related('register', 'user')
     serializer_class = BitacoraSerializer
     permission_classes = [IsAuthenticated]
+    keyset_pagination_class = BitacoraKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['register', 'user']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    
+    def get_queryset(self):
+        return scope_queryset(super().get_queryset(), self.request.user, 'register__distribuidor')
 
-class RegisterViewSet(viewsets.ModelViewSet):
+class RegisterViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     Gestión de registros de desconexión.
     Incluye auditoría automática al crear/actualizar.
+    Solo muestra los registros del distribuidor del usuario.
     """
-    # Optimizamos la consulta trayendo vehículo y responsable
-    queryset = Register.objects.all().select_related('vehicle', 'distribuidor').prefetch_related('bitacora_entries')
+    # Vehículo por JOIN y nombres de distribuidor/cliente anotados en SQL:
+    # una página cuesta lo mismo sin importar cuántas filas trae
+    queryset = Register.objects.with_vehicle_details()
     serializer_class = RegisterSerializer
     permission_classes = [IsAuthenticated]
+    # Listados de miles de filas: render con orjson cuando está disponible
+    renderer_classes = [FastJSONRenderer]
+    # ?pagination=cursor: scroll profundo sin OFFSET ni COUNT(*)
+    keyset_pagination_class = RegisterKeysetPagination
     
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     # Filtramos por fecha y tipo de problema (útil para reportes)
-    filterset_fields = ['report_date', 'type', 'distribuidor', 'last_status']
+    filterset_fields = ['report_date', 'type', 'distribuidor', 'last_status', 'disconnection_kind']
     search_fields = ['vehicle__vin', 'problem', 'comentario']
     ordering_fields = ['report_date', 'created_at']
     ordering = ['-report_date']
 
+    def get_queryset(self):
+        # Mismo filtro que VehicleViewSet, sobre Register.distribuidor (sin JOIN)
+        return scope_queryset(super().get_queryset(), self.request.user)
+
     def perform_create(self, serializer):
         """
         Al crear, pasamos el usuario actual al contexto para que
         la Bitacora sepa quién hizo el cambio (si el serializer lo requiere).
         """
-        serializer.save()
+        serializer.save(**self._derived_fields(serializer))
 
     def perform_update(self, serializer):
-        serializer.save()
+        serializer.save(**self._derived_fields(serializer))
 
+    @staticmethod
+    def _derived_fields(serializer):
+        """disconnection_kind se deriva de problem (igual que en RegisterService)"""
+        if 'problem' not in serializer.validated_data:
+            return {}
+        return {'disconnection_kind': Register.kind_from_problem(serializer.validated_data['problem'])}
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """
+        Triage masivo: aplica los mismos cambios a varios registros.
+        
+        Body:
+            ids: Lista de ids de registros (máximo BULK_UPDATE_MAX_IDS)
+            changes: Campos editables del registro (tipo, estatus_final,
+                responsable, comentario, problem), validados igual que en PATCH
+        
+        Cada registro que cambia queda en la bitácora con sus valores
+        anteriores, como en RegisterService.update_register.
+        """
+        ids = request.data.get('ids')
+        changes = request.data.get('changes')
+        
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return Response({'error': 'ids debe ser una lista de enteros'}, status=400)
+        if len(ids) > BULK_UPDATE_MAX_IDS:
+            return Response({'error': f'Máximo {BULK_UPDATE_MAX_IDS} registros por llamada'}, status=400)
+        if not isinstance(changes, dict) or not changes:
+            return Response({'error': 'changes debe ser un objeto con los campos a modificar'}, status=400)
+        
+        serializer = self.get_serializer(data=changes, partial=True)
+        editable = [
+            name for name, field in serializer.fields.items()
+            if not field.read_only and name in RegisterService.EDITABLE_FIELDS
+        ]
+        unknown = sorted(set(changes) - set(editable))
+        if unknown:
+            return Response({'error': f"Campos no editables: {', '.join(unknown)}"}, status=400)
+        serializer.is_valid(raise_exception=True)
+        
+        registers = scope_queryset(Register.objects.all(), request.user).filter(id__in=ids)
+        updated = RegisterService.bulk_update_registers(
+            registers, user=request.user, **serializer.validated_data
+        )
+        
+        found = set(registers.values_list('id', flat=True))
+        return Response({
+            'updated': len(updated),
+            'unchanged': len(found) - len(updated),
+            'not_found': sorted(set(ids) - found),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exportación del Concentrado en CSV (default) o XLSX (`?format=xlsx`).
+        Acepta los mismos filtros que el listado (report_date, type,
+        distribuidor, search, ordering). Las filas se leen con un cursor
+        del servidor por bloques, así que la memoria no crece con el tamaño
+        de la exportación.
+        """
+        export_format = request.query_params.get('format', 'csv').lower()
+        if export_format not in ('csv', 'xlsx'):
+            return Response({'error': 'format debe ser csv o xlsx'}, status=400)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*[source for _, source in EXPORT_COLUMNS]).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        header = [name for name, _ in EXPORT_COLUMNS]
+        contrato_position = header.index('contrato')
+        filename = f"concentrado_{timezone.localdate():%Y%m%d}.{export_format}"
+        
+        def export_rows():
+            for row in rows:
+                row = [_export_value(value) for value in row]
+                row[contrato_position] = 'SÍ' if row[contrato_position] else 'NO'
+                yield row
+        
+        if export_format == 'xlsx':
+            return self._export_xlsx(header, export_rows(), filename)
+        
+        writer = csv.writer(_EchoBuffer())
+        
+        def stream():
+            # BOM para que Excel abra correctamente los acentos
+            yield '\ufeff' + writer.writerow(header)
+            for row in export_rows():
+                yield writer.writerow(row)
+        
+        response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @staticmethod
+    def _export_xlsx(header, rows, filename):
+        """
+        Escribe el XLSX en modo write-only (filas directo a disco, no en
+        memoria) y lo entrega como archivo en streaming.
+        """
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            return Response(
+                {'error': 'Exportación XLSX no disponible: falta instalar openpyxl'},
+                status=400
+            )
+        
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Concentrado')
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    
     @action(detail=False, methods=['get'])
     def by_status(self, request):
         """
-        Endpoint rápido para gráfica de pay: Conteo por estatus.
+        Conteos para gráficas de pay, agregados en SQL.
+        
+        Query params:
+            start_date, end_date: Rango YYYY-MM-DD (default: últimos 30 días)
+            group_by: Dimensiones separadas por coma: estatus_final,
+                responsable, tipo, kind (default: estatus_final)
+            group_id: Filtro opcional (ID interno)
+        
+        Agrupa sobre Register (una fila por vehículo y día, el hecho diario)
+        con el rango de fechas por índice y el distribuidor del usuario.
         """
-        # Aquí puedes usar la lógica de agregación que aprendimos en vehicles
-        # Ejemplo simple:
-        from django.db.models import Count
-        data = Register.objects.values('last_status').annotate(total=Count('id'))
-        return Response(data)
\ No newline at end of file
+        dimensions = request.query_params.get('group_by', 'estatus_final').split(',')
+        unknown = [name for name in dimensions if name not in STATUS_DIMENSIONS]
+        if unknown:
+            return Response(
+                {'error': f"group_by debe ser una lista de: {', '.join(STATUS_DIMENSIONS)}"},
+                status=400
+            )
+        
+        try:
+            end_date = _parse_date(request.query_params.get('end_date')) or timezone.localdate()
+            start_date = _parse_date(request.query_params.get('start_date')) or end_date - timedelta(days=30)
+        except ValueError:
+            return Response({'error': 'Fechas inválidas, formato esperado YYYY-MM-DD'}, status=400)
+        if start_date > end_date:
+            return Response({'error': 'start_date debe ser menor o igual a end_date'}, status=400)
+        
+        registers = scope_queryset(Register.objects.all(), request.user).filter(
+            report_date__range=(start_date, end_date)
+        )
+        group_id = request.query_params.get('group_id')
+        if group_id:
+            try:
+                registers = registers.filter(group_id=int(group_id))
+            except ValueError:
+                return Response({'error': "Parámetro 'group_id' inválido, se espera un entero"}, status=400)
+        
+        fields = [STATUS_DIMENSIONS[name] for name in dimensions]
+        kind_labels = dict(Register.KIND_CHOICES)
+        results = []
+        for row in registers.values_list(*fields).annotate(total=Count('id')).order_by('-total', *fields):
+            entry = dict(zip(dimensions, row[:-1]))
+            if 'kind' in entry:
+                entry['kind'] = kind_labels.get(entry['kind'])
+            entry['total'] = row[-1]
+            results.append(entry)
+        
+        return Response({
+            'start_date': start_date.strftime('%Y-%m-%d'),
+            'end_date': end_date.strftime('%Y-%m-%d'),
+            'group_by': dimensions,
+            'total': sum(entry['total'] for entry in results),
+            'results': results,
+        })
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Geofence, Contrato, Vehicle
+from .models import Geofence, Contrato, Vehicle, VehicleSnapshot
 
 @admin.register(Vehicle)
 class VehicleAdmin(admin.ModelAdmin):
@@ -14,5 +14,12 @@ class VehicleAdmin(admin.ModelAdmin):
     
     connection_status_display.short_description = 'Estado Actual'
 
+@admin.register(VehicleSnapshot)
+class VehicleSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('snapshot_date', 'vehicle', 'group', 'connected', 'speed_bucket')
+    list_filter = ('snapshot_date', 'connected', 'speed_bucket')
+    list_select_related = ('vehicle', 'group')
+    raw_id_fields = ('vehicle', 'group', 'contrato', 'geofence')
+
 admin.site.register(Geofence)
 admin.site.register(Contrato)
\ No newline at end of file
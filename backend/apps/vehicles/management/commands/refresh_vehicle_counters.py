@@ -0,0 +1,40 @@
+"""
+Racha y contadores de desconexión de cada vehículo
+
+El ETL los actualiza al final de cada carga. Usar --rebuild la primera vez
+(o después de editar/archivar registros) para recalcular desde el histórico:
+    python manage.py refresh_vehicle_counters --rebuild
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.vehicles.services import DisconnectionCounterService
+from core.cache import bump_generation
+
+
+class Command(BaseCommand):
+    help = 'Actualiza racha, inicio de racha y desconexiones 7/30 días de los vehículos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recalcular desde todo el histórico')
+        parser.add_argument('--date', help='Día de referencia YYYY-MM-DD (default: hoy)')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date debe tener formato YYYY-MM-DD')
+
+        if options['rebuild']:
+            stats = DisconnectionCounterService.rebuild_counters(today)
+        else:
+            stats = DisconnectionCounterService.refresh_counters(today)
+        bump_generation()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['vehicles_updated']} vehículos actualizados, {stats['dark_today']} desconectados hoy"
+        ))
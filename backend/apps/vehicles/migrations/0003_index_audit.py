@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('vehicles', '0002_remove_vehicle_inner_id'),
+    ]
+
+    operations = [
+        # Primero los compuestos: en MySQL la FK necesita en todo momento un
+        # índice que empiece con su columna antes de soltar el índice simple.
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['group', 'last_connection'], name='vehicles_ve_group_i_56e805_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['distribuidor', 'last_connection'], name='vehicles_ve_distrib_7b388f_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='contrato',
+            name='vehicles_co_contrat_b325b0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='geofence',
+            name='vehicles_ge_geo_nam_a05353_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicles_ve_vehicle_5ac43f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicles_ve_vin_d8dea1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicles_ve_group_i_3b02b8_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vehicle',
+            name='vehicles_ve_last_co_684914_idx',
+        ),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='distribuidor',
+            field=models.ForeignKey(db_index=False, help_text='Distribuidor responsable', on_delete=django.db.models.deletion.PROTECT, related_name='vehicles', to='organization.distribuidor'),
+        ),
+        migrations.AlterField(
+            model_name='vehicle',
+            name='group',
+            field=models.ForeignKey(db_index=False, help_text='Grupo al que pertenece el vehículo', on_delete=django.db.models.deletion.PROTECT, related_name='vehicles', to='organization.group'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('vehicles', '0003_index_audit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField(help_text='Día de la foto')),
+                ('connected', models.BooleanField(help_text='El vehículo comunicó ese día')),
+                ('speed_bucket', models.PositiveSmallIntegerField(choices=[(0, 'Detenido'), (1, 'Baja (< 30 km/h)'), (2, 'Media (30-80 km/h)'), (3, 'Alta (>= 80 km/h)')], default=0, help_text='Rango de velocidad de la última posición')),
+                ('contrato', models.ForeignKey(blank=True, db_index=False, help_text='Contrato del vehículo ese día', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vehicle_snapshots', to='vehicles.contrato')),
+                ('geofence', models.ForeignKey(blank=True, db_index=False, help_text='Geocerca del vehículo ese día', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vehicle_snapshots', to='vehicles.geofence')),
+                ('group', models.ForeignKey(blank=True, db_index=False, help_text='Grupo del vehículo ese día', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vehicle_snapshots', to='organization.group')),
+                ('vehicle', models.ForeignKey(db_index=False, help_text='Vehículo', on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='vehicles.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Foto diaria de vehículo',
+                'verbose_name_plural': 'Fotos diarias de vehículos',
+                'indexes': [models.Index(fields=['snapshot_date', 'group', 'contrato', 'connected'], name='vehicles_ve_snapsho_c59562_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'snapshot_date'), name='unique_vehicle_snapshot_per_day')],
+            },
+        ),
+    ]
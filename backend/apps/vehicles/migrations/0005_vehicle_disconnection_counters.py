@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organization', '0003_index_audit'),
+        ('vehicles', '0004_vehicle_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='dark_since',
+            field=models.DateField(blank=True, help_text='Primer día de la racha de desconexión actual', null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='disconnection_streak',
+            field=models.PositiveIntegerField(default=0, help_text='Días consecutivos con desconexión hasta hoy'),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='disconnections_30d',
+            field=models.PositiveIntegerField(default=0, help_text='Registros de desconexión en los últimos 30 días'),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='disconnections_7d',
+            field=models.PositiveIntegerField(default=0, help_text='Registros de desconexión en los últimos 7 días'),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='last_dark_date',
+            field=models.DateField(blank=True, help_text='Último día con registro de desconexión', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['disconnections_7d', 'id'], name='vehicles_ve_disconn_fcf854_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['disconnections_30d', 'id'], name='vehicles_ve_disconn_e864df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['disconnection_streak', 'id'], name='vehicles_ve_disconn_8c6e55_idx'),
+        ),
+    ]
@@ -2,16 +2,35 @@
 
 """
 Vehicles Models - Gestión de vehículos, geocercas y contratos
-Tablas: Geofence, Vehicle, Contrato
+Tablas: Geofence, Vehicle, Contrato, VehicleSnapshot
 """
 
 from django.db import models
+from django.db.models import Q, F, Count, Case, When, Value, BooleanField, CharField
 from django.conf import settings
 from django.utils import timezone
+from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def start_of_today():
+    """
+    Medianoche local (TIME_ZONE) del día en curso.
+    `last_connection < start_of_today()` es el mismo corte que
+    Vehicle.connection_status (fecha local de last_connection < hoy), pero
+    como predicado de rango que puede usar el índice de last_connection.
+    """
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Ventanas (días) con contador precalculado en Vehicle
+DISCONNECTION_COUNTER_FIELDS = {
+    7: 'disconnections_7d',
+    30: 'disconnections_30d',
+}
+
     
 # ============================================================================
 # GEOFENCE MODEL
@@ -36,9 +55,7 @@ class Geofence(models.Model):
         verbose_name = 'Geocerca'
         verbose_name_plural = 'Geocercas'
         ordering = ['geo_name']
-        indexes = [
-            models.Index(fields=['geo_name']),
-        ]
+        # geo_name ya es unique: no necesita un índice adicional
     
     def __str__(self):
         return self.geo_name
@@ -74,7 +91,6 @@ class Contrato(models.Model):
         verbose_name_plural = 'Contratos'
         ordering = ['-contrato_id']
         indexes = [
-            models.Index(fields=['contrato_id']),
             models.Index(fields=['vin']),
         ]
     
@@ -82,6 +98,59 @@ class Contrato(models.Model):
         return f"Contrato {self.contrato} (VIN: {self.vin[:8]}...)"
 
 
+# ============================================================================
+# VEHICLE QUERYSET
+# ============================================================================
+class VehicleQuerySet(models.QuerySet):
+    """
+    QuerySet de vehículos con el estado de conexión calculado en SQL.
+    """
+    
+    def with_connection_status(self, today_start=None):
+        """
+        Anota `is_disconnected` y `disconnection_label` con un CASE en SQL,
+        equivalentes a las propiedades connection_status/disconnected_type.
+        
+        Args:
+            today_start: Corte del día (default: start_of_today())
+        """
+        today_start = today_start or start_of_today()
+        disconnected = Q(last_connection__isnull=True) | Q(last_connection__lt=today_start)
+        
+        return self.annotate(
+            is_disconnected=Case(
+                When(disconnected, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+            disconnection_label=Case(
+                When(disconnected & Q(speed__gt=0), then=Value('Trayecto')),
+                When(disconnected, then=Value('Base')),
+                default=Value('Conectado'),
+                output_field=CharField(),
+            ),
+        )
+    
+    def top_disconnected(self, days=30):
+        """
+        Vehículos con desconexiones en los últimos `days` días (hoy incluido),
+        del que más tiene al que menos, anotados con `disconnection_count`.
+        
+        7 y 30 días leen los contadores que mantiene el ETL: ORDER BY sobre
+        índice, sin JOIN ni COUNT. Otras ventanas cuentan registros.
+        """
+        counter_field = DISCONNECTION_COUNTER_FIELDS.get(days)
+        if counter_field:
+            return self.filter(**{f'{counter_field}__gt': 0}).annotate(
+                disconnection_count=F(counter_field)
+            ).order_by(f'-{counter_field}', '-id')
+        
+        start_date = timezone.localdate() - timedelta(days=days - 1)
+        return self.filter(registers__report_date__gte=start_date).annotate(
+            disconnection_count=Count('registers')
+        ).order_by('-disconnection_count', '-id')
+
+
 # ============================================================================
 # VEHICLE MODEL
 # ============================================================================
@@ -107,16 +176,19 @@ class Vehicle(models.Model):
     )
     
     # Relaciones
+    # group y distribuidor se indexan en los compuestos de Meta.indexes
     group = models.ForeignKey(
         'organization.Group',
         on_delete=models.PROTECT,
         related_name='vehicles',
+        db_index=False,
         help_text='Grupo al que pertenece el vehículo'
     )
     distribuidor = models.ForeignKey(
         'organization.Distribuidor',
         on_delete=models.PROTECT,
         related_name='vehicles',
+        db_index=False,
         help_text='Distribuidor responsable'
     )
     geofence = models.ForeignKey(
@@ -162,16 +234,43 @@ class Vehicle(models.Model):
         help_text='Última velocidad registrada del vehículo en km/h'
     )
     
+    # Contadores de desconexión precalculados por el ETL
+    # (DisconnectionCounterService.refresh_counters)
+    disconnection_streak = models.PositiveIntegerField(
+        default=0,
+        help_text='Días consecutivos con desconexión hasta hoy'
+    )
+    dark_since = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Primer día de la racha de desconexión actual'
+    )
+    last_dark_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Último día con registro de desconexión'
+    )
+    disconnections_7d = models.PositiveIntegerField(
+        default=0,
+        help_text='Registros de desconexión en los últimos 7 días'
+    )
+    disconnections_30d = models.PositiveIntegerField(
+        default=0,
+        help_text='Registros de desconexión en los últimos 30 días'
+    )
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = VehicleQuerySet.as_manager()
+    
     # Propiedades calculadas
     @property
     def connection_status(self):
         if not self.last_connection:
             return True
-        return self.last_connection.date() < timezone.now().date()
+        return timezone.localdate(self.last_connection) < timezone.localdate()
     
     @property
     def disconnected_type(self):
@@ -183,12 +282,119 @@ class Vehicle(models.Model):
         verbose_name = 'Vehículo'
         verbose_name_plural = 'Vehículos'
         ordering = ['-last_connection']
+        # vehicle_id (unique), vin y last_connection (db_index) ya tienen índice.
+        # Compuestos para los filtros reales: vehículos de un grupo o de un
+        # distribuidor (VehicleViewSet, statistics) por rango de last_connection.
+        # Contadores + id: top-N como ORDER BY ... LIMIT sobre el índice.
         indexes = [
-            models.Index(fields=['vehicle_id']),
-            models.Index(fields=['vin']),
-            models.Index(fields=['group']),
-            models.Index(fields=['last_connection']),
+            models.Index(fields=['group', 'last_connection']),
+            models.Index(fields=['distribuidor', 'last_connection']),
+            models.Index(fields=['disconnections_7d', 'id']),
+            models.Index(fields=['disconnections_30d', 'id']),
+            models.Index(fields=['disconnection_streak', 'id']),
         ]
     
     def __str__(self):
         return f"Vehículo {self.vin[:8]}... (ID: {self.vehicle_id})"
+
+
+# ============================================================================
+# VEHICLE SNAPSHOT MODEL
+# ============================================================================
+class VehicleSnapshot(models.Model):
+    """
+    Foto diaria de conectividad por vehículo, escrita por el ETL.
+    Una fila por (snapshot_date, vehicle): la última corrida del día gana.
+    Tabla angosta y solo de inserción, pensada para particionarse por fecha.
+    Grupo y contrato se guardan como estaban ese día, para que el histórico
+    de conectados/total no cambie cuando el vehículo se mueve.
+    """
+    
+    # Rangos de velocidad (km/h) al momento de la foto
+    SPEED_STOPPED = 0
+    SPEED_LOW = 1
+    SPEED_MEDIUM = 2
+    SPEED_HIGH = 3
+    SPEED_BUCKET_CHOICES = [
+        (SPEED_STOPPED, 'Detenido'),
+        (SPEED_LOW, 'Baja (< 30 km/h)'),
+        (SPEED_MEDIUM, 'Media (30-80 km/h)'),
+        (SPEED_HIGH, 'Alta (>= 80 km/h)'),
+    ]
+    
+    snapshot_date = models.DateField(
+        help_text='Día de la foto'
+    )
+    # vehicle se indexa con el UniqueConstraint (vehicle, snapshot_date)
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        db_index=False,
+        help_text='Vehículo'
+    )
+    group = models.ForeignKey(
+        'organization.Group',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vehicle_snapshots',
+        db_index=False,
+        help_text='Grupo del vehículo ese día'
+    )
+    contrato = models.ForeignKey(
+        Contrato,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vehicle_snapshots',
+        db_index=False,
+        help_text='Contrato del vehículo ese día'
+    )
+    geofence = models.ForeignKey(
+        Geofence,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='vehicle_snapshots',
+        db_index=False,
+        help_text='Geocerca del vehículo ese día'
+    )
+    connected = models.BooleanField(
+        help_text='El vehículo comunicó ese día'
+    )
+    speed_bucket = models.PositiveSmallIntegerField(
+        choices=SPEED_BUCKET_CHOICES,
+        default=SPEED_STOPPED,
+        help_text='Rango de velocidad de la última posición'
+    )
+    
+    class Meta:
+        verbose_name = 'Foto diaria de vehículo'
+        verbose_name_plural = 'Fotos diarias de vehículos'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vehicle', 'snapshot_date'],
+                name='unique_vehicle_snapshot_per_day',
+            ),
+        ]
+        # (snapshot_date, group, contrato, connected): conectados/total por día
+        # para matriz y series, resuelto solo con el índice
+        indexes = [
+            models.Index(fields=['snapshot_date', 'group', 'contrato', 'connected']),
+        ]
+    
+    def __str__(self):
+        return f"Foto {self.vehicle_id} ({self.snapshot_date})"
+    
+    @classmethod
+    def speed_bucket_for(cls, speed) -> int:
+        """Rango de velocidad para una lectura en km/h"""
+        speed = speed or 0
+        if speed <= 0:
+            return cls.SPEED_STOPPED
+        if speed < 30:
+            return cls.SPEED_LOW
+        if speed < 80:
+            return cls.SPEED_MEDIUM
+        return cls.SPEED_HIGH
@@ -41,8 +41,11 @@ class VehicleSerializer(serializers.ModelSerializer):
             'id', 'vehicle_id', 'vin', 'speed', 'last_connection',
             'group_name', 'distribuidor_name', 'geofence_name',
             'connection_status', 'disconnected_type', 
-            'last_latitude', 'last_longitude'
+            'last_latitude', 'last_longitude',
+            'disconnection_streak', 'dark_since',
+            'disconnections_7d', 'disconnections_30d'
         ]
+        read_only_fields = ['disconnection_streak', 'dark_since', 'disconnections_7d', 'disconnections_30d']
 
     # Mantenemos las validaciones de VS Code porque están chidas
     def validate_vin(self, value):
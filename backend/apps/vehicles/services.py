@@ -1,16 +1,23 @@
 """
 Services for Vehicles App
-ETL services for importing vehicle data from external endpoints
+ETL services for importing vehicle data from external endpoints,
+the precomputed per-vehicle disconnection counters and the cached
+fleet connection KPIs
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import datetime
+from datetime import date, timedelta
 import logging
 
-from .models import Vehicle, Geofence, Contrato
-from apps.organization.models import Group, Distribuidor
+from .models import Vehicle, start_of_today
+from apps.authentication.scoping import scope_cache_key
+from apps.registers.models import Register
+from core.cache import get_or_compute, set_value
+from services.import_engine import ImportEngine
 
 logger = logging.getLogger(__name__)
 
@@ -18,13 +25,15 @@ logger = logging.getLogger(__name__)
 class VehicleETLService:
     """
     Service for extracting, transforming, and loading vehicle data
-    from external endpoint to database
+    from external endpoint to database (through the shared ImportEngine)
     """
     
     @staticmethod
     def import_vehicle_data(endpoint_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Import vehicle data from endpoint into database.
+        Same mapping as the ETL: dimensions, vehicles, disconnection
+        registers and daily snapshots, loaded in batches.
         
         Expected endpoint structure:
         {
@@ -66,118 +75,269 @@ class VehicleETLService:
             logger.warning("No vehicle data provided for import")
             return stats
         
+        # Mismo motor y reglas que el ETL (services.import_engine)
+        engine = ImportEngine()
         with transaction.atomic():
-            for vehicle_data in endpoint_data:
-                try:
-                    result = VehicleETLService._process_vehicle(vehicle_data)
-                    if result["action"] == "created":
-                        stats["created"] += 1
-                    elif result["action"] == "updated":
-                        stats["updated"] += 1
-                except Exception as e:
-                    stats["failed"] += 1
-                    error_msg = f"Error processing vehicle {vehicle_data.get('vehicle_id')}: {str(e)}"
-                    stats["errors"].append(error_msg)
-                    logger.error(error_msg)
-        
-        logger.info(f"Vehicle import completed - Created: {stats['created']}, Updated: {stats['updated']}, Failed: {stats['failed']}")
+            engine_stats = engine.run(endpoint_data)
+        
+        stats["created"] = engine_stats["vehicles_created"]
+        stats["updated"] = engine_stats["vehicles_updated"]
+        stats["failed"] = engine_stats["errors"]
+        stats["errors"] = engine.error_messages
+        
+        logger.info(
+            "Vehicle import completed - Created: %s, Updated: %s, Failed: %s",
+            stats['created'], stats['updated'], stats['failed']
+        )
         return stats
     
     @staticmethod
-    def _process_vehicle(vehicle_data: Dict[str, Any]) -> Dict[str, str]:
+    def sync_vehicles_with_endpoint(vehicles_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Process a single vehicle record from endpoint.
+        Sync vehicles from endpoint with database, updating timestamps.
         
         Args:
-            vehicle_data: Vehicle data dictionary from endpoint
+            vehicles_data: List of vehicle data from endpoint
             
         Returns:
-            Dict with action taken: {"action": "created"|"updated", "vehicle_id": int}
+            Import statistics dictionary
         """
-        vehicle_id = vehicle_data.get('vehicle_id')
+        return VehicleETLService.import_vehicle_data(vehicles_data)
+
+
+class DisconnectionCounterService:
+    """
+    Maintains the disconnection counters stored on Vehicle:
+    current streak (consecutive dark days up to today), the first day of
+    that streak, and register counts for the last 7 and 30 days.
+
+    A vehicle is "dark" on a day when it has a disconnection register for
+    that day (the ETL creates at most one per vehicle and day).
+    """
+    
+    COUNTER_FIELDS = [
+        'disconnection_streak', 'dark_since', 'last_dark_date',
+        'disconnections_7d', 'disconnections_30d',
+    ]
+    
+    @staticmethod
+    def refresh_counters(today: Optional[date] = None) -> Dict[str, int]:
+        """
+        Incremental refresh, run by the ETL after each load.
         
-        if not vehicle_id:
-            raise ValueError("vehicle_id is required")
+        Window counts come from one aggregate over the last 30 days of
+        registers (report_date index); the streak is extended from the
+        stored last_dark_date, so history older than the window is never
+        read. Only vehicles whose counters change are written.
         
-        # Get or create Group
-        group_id = vehicle_data.get('group_id')
-        group_name = vehicle_data.get('group_name', 'Unknown')
+        Args:
+            today: Reference day (defaults to the current date)
+            
+        Returns:
+            {"vehicles_updated": int, "dark_today": int}
+        """
+        today = today or timezone.localdate()
+        yesterday = today - timedelta(days=1)
         
-        if group_id:
-            group, _ = Group.objects.get_or_create(
-                group_id=group_id,
-                defaults={'group_description': group_name, 'client_id': vehicle_data.get('client_id')}
-            )
-        else:
-            raise ValueError(f"group_id is required for vehicle {vehicle_id}")
-        
-        # Get or create Distribuidor
-        distribuidor_name = vehicle_data.get('client_name', 'Unknown')
-        distribuidor, _ = Distribuidor.objects.get_or_create(
-            distribuidor_id=vehicle_data.get('client_id', 0),
-            defaults={'distribuidor_name': distribuidor_name}
-        )
+        window = Register.objects.filter(report_date__range=(today - timedelta(days=29), today))
+        counts = {
+            row['vehicle_id']: row
+            for row in window.values('vehicle_id').annotate(
+                last_30=Count('id'),
+                last_7=Count('id', filter=Q(report_date__gte=today - timedelta(days=6))),
+                dark_today=Count('id', filter=Q(report_date=today)),
+            ).order_by()
+        }
         
-        # Get or create Geofence
-        geofence = None
-        geofence_name = vehicle_data.get('geofence_name')
-        if geofence_name:
-            geofence, _ = Geofence.objects.get_or_create(
-                geo_name=geofence_name
-            )
+        # Vehicles with activity in the window, plus those that need a reset
+        vehicles = Vehicle.objects.filter(
+            Q(id__in=list(counts)) | Q(disconnections_30d__gt=0) | Q(disconnection_streak__gt=0)
+        ).only('id', *DisconnectionCounterService.COUNTER_FIELDS)
         
-        # Get or create Contrato if VIN exists
-        contrato = None
-        vin = vehicle_data.get('vin', '')
-        if vin:
-            try:
-                contrato = Contrato.objects.get(vin=vin)
-            except Contrato.DoesNotExist:
-                # Contrato might not exist yet, which is OK
-                pass
-        
-        # Parse last_communication_time
-        last_connection = None
-        last_comm = vehicle_data.get('last_communication_time')
-        if last_comm:
-            try:
-                # Try parsing ISO format
-                last_connection = datetime.fromisoformat(last_comm.replace('Z', '+00:00'))
-                if timezone.is_naive(last_connection):
-                    last_connection = timezone.make_aware(last_connection)
-            except (ValueError, AttributeError):
-                logger.warning(f"Could not parse last_communication_time: {last_comm}")
-        
-        # Create or update Vehicle
-        vehicle, created = Vehicle.objects.update_or_create(
-            vehicle_id=vehicle_id,
-            defaults={
-                'vin': vin,
-                'group': group,
-                'distribuidor': distribuidor,
-                'geofence': geofence,
-                'contrato': contrato,
-                'last_latitude': vehicle_data.get('latitude'),
-                'last_longitude': vehicle_data.get('longitude'),
-                'last_connection': last_connection,
-                'inner_id': vehicle_data.get('inner_id'),
+        changed = []
+        dark_today = 0
+        for vehicle in vehicles:
+            row = counts.get(vehicle.id)
+            values = {
+                'disconnections_7d': row['last_7'] if row else 0,
+                'disconnections_30d': row['last_30'] if row else 0,
+                'last_dark_date': vehicle.last_dark_date,
             }
-        )
+            
+            if row and row['dark_today']:
+                dark_today += 1
+                if vehicle.last_dark_date == today:
+                    # Already counted by an earlier run today
+                    values['disconnection_streak'] = vehicle.disconnection_streak
+                    values['dark_since'] = vehicle.dark_since
+                elif vehicle.last_dark_date == yesterday and vehicle.disconnection_streak:
+                    values['disconnection_streak'] = vehicle.disconnection_streak + 1
+                    values['dark_since'] = vehicle.dark_since
+                else:
+                    values['disconnection_streak'] = 1
+                    values['dark_since'] = today
+                values['last_dark_date'] = today
+            else:
+                values['disconnection_streak'] = 0
+                values['dark_since'] = None
+            
+            if DisconnectionCounterService._apply(vehicle, values):
+                changed.append(vehicle)
         
-        return {
-            "action": "created" if created else "updated",
-            "vehicle_id": vehicle_id
-        }
+        DisconnectionCounterService._save(changed)
+        logger.info('Disconnection counters refreshed: %s vehicles updated, %s dark today', len(changed), dark_today)
+        return {'vehicles_updated': len(changed), 'dark_today': dark_today}
     
     @staticmethod
-    def sync_vehicles_with_endpoint(vehicles_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def rebuild_counters(today: Optional[date] = None) -> Dict[str, int]:
         """
-        Sync vehicles from endpoint with database, updating timestamps.
+        Full rebuild from the register history (first deploy, or after
+        registers were edited or archived). Streaks are walked back from
+        today over each vehicle's distinct report dates.
         
         Args:
-            vehicles_data: List of vehicle data from endpoint
+            today: Reference day (defaults to the current date)
             
         Returns:
-            Import statistics dictionary
+            {"vehicles_updated": int, "dark_today": int}
         """
-        return VehicleETLService.import_vehicle_data(vehicles_data)
+        today = today or timezone.localdate()
+        start_7d = today - timedelta(days=6)
+        start_30d = today - timedelta(days=29)
+        
+        computed = {}
+        dates = Register.objects.filter(report_date__lte=today).values_list(
+            'vehicle_id', 'report_date'
+        ).order_by('vehicle_id', '-report_date').distinct()
+        
+        for vehicle_id, report_date in dates.iterator(chunk_size=settings.ETL_BATCH_SIZE):
+            values = computed.get(vehicle_id)
+            if values is None:
+                values = computed[vehicle_id] = {
+                    'disconnection_streak': 0, 'dark_since': None, 'last_dark_date': report_date,
+                    'disconnections_7d': 0, 'disconnections_30d': 0,
+                }
+            
+            if report_date >= start_30d:
+                values['disconnections_30d'] += 1
+                if report_date >= start_7d:
+                    values['disconnections_7d'] += 1
+            
+            # Dates arrive newest first: the streak continues while they are consecutive
+            if report_date == today - timedelta(days=values['disconnection_streak']):
+                values['disconnection_streak'] += 1
+                values['dark_since'] = report_date
+        
+        empty = {
+            'disconnection_streak': 0, 'dark_since': None, 'last_dark_date': None,
+            'disconnections_7d': 0, 'disconnections_30d': 0,
+        }
+        changed = []
+        dark_today = 0
+        for vehicle in Vehicle.objects.only('id', *DisconnectionCounterService.COUNTER_FIELDS).iterator(
+            chunk_size=settings.ETL_BATCH_SIZE
+        ):
+            values = computed.get(vehicle.id, empty)
+            if values['last_dark_date'] == today:
+                dark_today += 1
+            if DisconnectionCounterService._apply(vehicle, values):
+                changed.append(vehicle)
+        
+        DisconnectionCounterService._save(changed)
+        logger.info('Disconnection counters rebuilt: %s vehicles updated, %s dark today', len(changed), dark_today)
+        return {'vehicles_updated': len(changed), 'dark_today': dark_today}
+    
+    @staticmethod
+    def _apply(vehicle: Vehicle, values: Dict[str, Any]) -> bool:
+        """Sets the counter values on the instance; True if any changed"""
+        changed = False
+        for field, value in values.items():
+            if getattr(vehicle, field) != value:
+                setattr(vehicle, field, value)
+                changed = True
+        return changed
+    
+    @staticmethod
+    def _save(vehicles: List[Vehicle]) -> None:
+        if vehicles:
+            Vehicle.objects.bulk_update(
+                vehicles, DisconnectionCounterService.COUNTER_FIELDS, batch_size=settings.ETL_BATCH_SIZE
+            )
+
+
+class FleetKPIService:
+    """
+    Fleet connection KPIs (VehicleViewSet.statistics).
+    
+    Computed with range predicates on last_connection (same cut as
+    Vehicle.connection_status), so the (distribuidor, last_connection)
+    and last_connection indexes apply instead of a DATE() per row.
+    Cached per distributor scope and local day; the ETL refreshes every scope
+    after each load.
+    """
+    
+    CACHE_NAMESPACE = 'fleet_kpis'
+    
+    @staticmethod
+    def get_kpis(distribuidor_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Args:
+            distribuidor_id: Restrict to one distributor (None = whole fleet)
+            
+        Returns:
+            {"total", "conectados", "desconectados",
+             "desconectados_trayecto", "desconectados_base"}
+        """
+        today_start = start_of_today()
+        today = timezone.localdate(today_start)
+        
+        def compute():
+            vehicles = Vehicle.objects.all()
+            if distribuidor_id:
+                vehicles = vehicles.filter(distribuidor_id=distribuidor_id)
+            return vehicles.aggregate(**FleetKPIService._aggregates(today_start))
+        
+        return get_or_compute(
+            FleetKPIService.CACHE_NAMESPACE,
+            (scope_cache_key(distribuidor_id), today),
+            compute,
+        )
+    
+    @staticmethod
+    def refresh() -> int:
+        """
+        Recomputes the KPIs of the whole fleet and of every distributor with
+        one grouped query and stores them in the cache.
+        
+        Returns:
+            Number of scopes cached
+        """
+        today_start = start_of_today()
+        today = timezone.localdate(today_start)
+        rows = Vehicle.objects.values('distribuidor_id').annotate(
+            **FleetKPIService._aggregates(today_start)
+        ).order_by()
+        
+        fleet = dict.fromkeys(FleetKPIService._aggregates(today_start), 0)
+        scopes = 0
+        for row in rows:
+            distribuidor_id = row.pop('distribuidor_id')
+            for key, value in row.items():
+                fleet[key] += value
+            set_value(FleetKPIService.CACHE_NAMESPACE, (scope_cache_key(distribuidor_id), today), row)
+            scopes += 1
+        
+        set_value(FleetKPIService.CACHE_NAMESPACE, (scope_cache_key(None), today), fleet)
+        return scopes + 1
+    
+    @staticmethod
+    def _aggregates(today_start) -> Dict[str, Count]:
+        disconnected = Q(last_connection__lt=today_start)
+        connected_today = Q(last_connection__gte=today_start, last_connection__lt=today_start + timedelta(days=1))
+        return {
+            'total': Count('id'),
+            'conectados': Count('id', filter=connected_today),
+            'desconectados': Count('id', filter=disconnected | Q(last_connection__isnull=True)),
+            'desconectados_trayecto': Count('id', filter=disconnected & Q(speed__gt=0)),
+            'desconectados_base': Count('id', filter=disconnected & Q(speed__lte=0)),
+        }
@@ -5,61 +5,99 @@ Views for Vehicles App
 Handles Vehicle, Geofence, and Contrato endpoints
 """
 
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.db.models import F
 from rest_framework.decorators import action
-from django.utils import timezone
 from .models import Vehicle, Geofence, Contrato
 from .serializers import VehicleSerializer, GeofenceSerializer, ContratoSerializer
+from .services import FleetKPIService
 from apps.authentication.permissions import IsPMOrAdmin
+from apps.authentication.scoping import get_scope, scope_queryset
+from core.renderers import FastJSONRenderer
+from core.pagination import KeysetPaginationMixin, VehicleKeysetPagination
 
-class VehicleViewSet(viewsets.ModelViewSet):
+# Columnas del modo rápido (?fast=true): mismas llaves que VehicleSerializer
+FAST_LIST_FIELDS = (
+    'id', 'vehicle_id', 'vin', 'speed', 'last_connection',
+    'last_latitude', 'last_longitude',
+    'disconnection_streak', 'dark_since', 'disconnections_7d', 'disconnections_30d',
+)
+FAST_LIST_EXPRESSIONS = {
+    'group_name': F('group__group_description'),
+    'distribuidor_name': F('distribuidor__distribuidor_name'),
+    'geofence_name': F('geofence__geo_name'),
+    'connection_status': F('is_disconnected'),
+    'disconnected_type': F('disconnection_label'),
+}
+
+class VehicleViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     Punto de entrada para los vehículos.
     Solo muestra los vehículos que pertenecen al distribuidor del usuario.
     """
     serializer_class = VehicleSerializer
     permission_classes = [IsAuthenticated]
+    # Listados de miles de filas: render con orjson cuando está disponible
+    renderer_classes = [FastJSONRenderer]
+    # ?pagination=cursor: scroll profundo sin OFFSET ni COUNT(*)
+    keyset_pagination_class = VehicleKeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     
     # Filtros para tus reportes dinámicos
     filterset_fields = ['group', 'geofence', 'distribuidor'] 
     search_fields = ['vin', 'vehicle_id']
-    ordering_fields = ['last_connection', 'speed']
+    ordering_fields = ['last_connection', 'speed', 'disconnection_streak', 'disconnections_7d', 'disconnections_30d']
 
     def get_queryset(self):
         """
         MAGIA DE SEGURIDAD: 
         Filtramos la base de datos según el usuario logueado.
         """
-        user = self.request.user
         queryset = Vehicle.objects.all().select_related('group', 'distribuidor', 'geofence')
 
         # Si el usuario NO es superusuario, solo ve su distribuidor
-        if not user.is_superuser and user.distribuidor:
-            return queryset.filter(distribuidor=user.distribuidor)
+        return scope_queryset(queryset, self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Listado de vehículos.
+        Con `?fast=true` se salta el ModelSerializer: trae tuplas con .values()
+        (nombres por JOIN y estado de conexión calculado en SQL) y serializa
+        dicts planos con las mismas llaves que VehicleSerializer.
+        """
+        if request.query_params.get('fast', '').lower() not in ('1', 'true'):
+            return super().list(request, *args, **kwargs)
         
-        return queryset
+        rows = self.filter_queryset(self.get_queryset()).with_connection_status().values(
+            *FAST_LIST_FIELDS, **FAST_LIST_EXPRESSIONS
+        )
+        
+        page = self.paginate_queryset(rows)
+        data = self._format_fast_rows(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+    
+    @staticmethod
+    def _format_fast_rows(rows):
+        """Formatea last_connection igual que el serializer (zona local, ISO 8601)"""
+        datetime_field = serializers.DateTimeField()
+        data = list(rows)
+        for row in data:
+            if row['last_connection'] is not None:
+                row['last_connection'] = datetime_field.to_representation(row['last_connection'])
+        return data
     
     @action(detail=False, methods=['get'], permission_classes=[IsPMOrAdmin])
     def statistics(self, request):
-        
-        user = self.request.user
-        hoy = timezone.now().date()
-        
-        queryset = self.get_queryset()
-        
-        stats = queryset.aggregate(
-            total=Count('id'),
-            conectados=Count('id', filter=Q(last_connection__date=hoy)),
-            desconectados=Count('id', filter=Q(last_connection__date__lt=hoy) | Q(last_connection__isnull=True)),
-            desconectados_trayecto=Count('id', filter=Q(last_connection__date__lt=hoy) & Q(speed__gt=0)),
-            desconectados_base=Count('id', filter=Q(last_connection__date__lt=hoy) & Q(speed__lte=0))
-        )
-        return Response(stats)
+        """
+        KPIs de conexión de la flota (del distribuidor del usuario).
+        Se sirven del cache que el ETL refresca en cada carga.
+        """
+        return Response(FleetKPIService.get_kpis(get_scope(request.user)))
 
 # Simplificamos los otros ViewSets
 class GeofenceViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,59 @@
+"""
+Cache helpers for expensive analytics results
+Keys carry a data generation number that is bumped after every ETL load
+(and other bulk data changes), so cached results never outlive the data
+they were computed from and nothing has to be deleted explicitly. Old
+generations simply expire.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import CACHE_REQUESTS
+
+
+GENERATION_KEY = 'analytics:generation'
+
+
+def get_generation():
+    """Current data generation (created on first use)"""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Seeded from the clock: if the key is evicted, the new generation
+        # can't collide with keys written under an older one
+        cache.add(GENERATION_KEY, int(time.time()), timeout=None)
+        generation = cache.get(GENERATION_KEY, int(time.time()))
+    return generation
+
+
+def bump_generation():
+    """Invalidates every cached analytics result"""
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        return get_generation()
+
+
+def make_key(namespace, *parts):
+    return ':'.join(['analytics', namespace, f'g{get_generation()}', *(str(part) for part in parts)])
+
+
+def set_value(namespace, parts, value, timeout=None):
+    """Stores a precomputed value for (namespace, *parts) in the current generation"""
+    cache.set(make_key(namespace, *parts), value, timeout or settings.ANALYTICS_CACHE_TIMEOUT)
+
+
+def get_or_compute(namespace, parts, compute, timeout=None):
+    """
+    Cached value for (namespace, *parts) in the current generation,
+    computed and stored on a miss.
+    """
+    key = make_key(namespace, *parts)
+    value = cache.get(key)
+    CACHE_REQUESTS.labels(namespace, 'miss' if value is None else 'hit').inc()
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout or settings.ANALYTICS_CACHE_TIMEOUT)
+    return value
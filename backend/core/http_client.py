@@ -9,6 +9,8 @@ from typing import Dict, List, Any, Optional
 from urllib.parse import urljoin
 from django.conf import settings
 
+from core.metrics import track_http
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,13 +85,13 @@ class EndpointClient:
                 **filters
             }
             
-            response = self.session.get(
-                url,
-                params=params,
-                timeout=self.timeout
-            )
-            
-            response.raise_for_status()
+            with track_http('endpoint'):
+                response = self.session.get(
+                    url,
+                    params=params,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
             data = response.json()
             
             return self._validate_response(data)
@@ -131,12 +133,12 @@ class EndpointClient:
         try:
             url = urljoin(self.base_url, f'/vehicles/{vehicle_id}')
             
-            response = self.session.get(
-                url,
-                timeout=self.timeout
-            )
-            
-            response.raise_for_status()
+            with track_http('endpoint'):
+                response = self.session.get(
+                    url,
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
             data = response.json()
             
             if not isinstance(data, dict):
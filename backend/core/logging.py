@@ -0,0 +1,49 @@
+"""
+Non-blocking log pipeline
+Loggers write to a QueueHandler, which only puts the record on an in-memory
+queue; a QueueListener thread does the formatting, console output and
+RotatingFileHandler writes (and rotation checks) off the request/ETL path.
+
+    'queue': {
+        '()': 'core.logging.QueueListenerHandler',
+        'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+    }
+
+dictConfig builds handlers in name order, so the queue handler's name must
+sort after the handlers it references. The listener drains the queue when
+logging shuts down at process exit and is restarted in processes forked after configuration
+(gunicorn with preload_app).
+"""
+
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueListenerHandler(QueueHandler):
+    """QueueHandler that owns the QueueListener feeding the real handlers"""
+
+    def __init__(self, handlers, respect_handler_level=True):
+        super().__init__(queue.SimpleQueue())
+        # Indexing resolves the cfg:// references to the configured handlers
+        handlers = [handlers[i] for i in range(len(handlers))]
+        self.listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=respect_handler_level
+        )
+        self.listener.start()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart)
+
+    def close(self):
+        # logging.shutdown() closes handlers newest first: the queue is
+        # drained while the console/file handlers are still open
+        if self.listener._thread is not None:
+            self.listener.stop()
+        super().close()
+
+    def _restart(self):
+        # The listener thread does not survive fork: start a new one on a
+        # fresh queue (the old one may have been locked mid-operation)
+        self.queue = self.listener.queue = queue.SimpleQueue()
+        self.listener._thread = None
+        self.listener.start()
@@ -0,0 +1,144 @@
+"""
+Prometheus metrics for the API, the ETL, the external HTTP client and the cache
+Backed by prometheus_client when it is installed; otherwise every metric
+is a no-op and /metrics answers 503.
+
+Multiple gunicorn workers: set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory (cleared on deploy) so each worker writes its samples
+there and /metrics aggregates all of them, and add to gunicorn.conf.py:
+
+    from prometheus_client import multiprocess
+
+    def child_exit(server, worker):
+        multiprocess.mark_process_dead(worker.pid)
+"""
+
+import os
+from contextlib import contextmanager
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+
+
+class _NoopMetric:
+    """Stand-in with the prometheus_client API used in this project"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+
+def _counter(name, documentation, labelnames):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def _histogram(name, documentation, labelnames, buckets=None):
+    if prometheus_client is None:
+        return _NoopMetric()
+    if buckets is None:
+        return Histogram(name, documentation, labelnames)
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+# API (MetricsMiddleware): view = nombre de la ruta de DRF/Django
+API_REQUESTS = _counter(
+    'api_requests', 'Requests served', ['method', 'view', 'status']
+)
+API_REQUEST_DURATION = _histogram(
+    'api_request_duration_seconds', 'Request latency', ['method', 'view'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# ETL (ETLService.run_etl)
+ETL_RUNS = _counter(
+    'etl_runs', 'ETL runs by result', ['result']
+)
+ETL_STAGE_DURATION = _histogram(
+    'etl_stage_duration_seconds', 'Duration of each ETL stage', ['stage'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800),
+)
+ETL_ROWS = _counter(
+    'etl_rows', 'Rows processed by the ETL', ['kind']
+)
+
+# Cliente HTTP externo (telemetría)
+HTTP_CLIENT_REQUESTS = _counter(
+    'http_client_requests', 'Requests to external endpoints', ['target', 'outcome']
+)
+HTTP_CLIENT_DURATION = _histogram(
+    'http_client_request_duration_seconds', 'External request latency', ['target']
+)
+
+# Cache de analytics (core.cache)
+CACHE_REQUESTS = _counter(
+    'cache_requests', 'Analytics cache lookups', ['namespace', 'result']
+)
+
+
+@contextmanager
+def track_http(target):
+    """
+    Times an external request and counts it by outcome
+    ('ok' or the exception class name).
+    """
+    start = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        HTTP_CLIENT_DURATION.labels(target).observe(time.perf_counter() - start)
+        HTTP_CLIENT_REQUESTS.labels(target, outcome).inc()
+
+
+# ============================================================================
+# ENDPOINT
+# ============================================================================
+def metrics_view(request):
+    """
+    Prometheus text exposition. Requires `Authorization: Bearer <token>`
+    with METRICS_TOKEN; without a token it is only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+
+    if prometheus_client is None:
+        return HttpResponse('prometheus_client no está instalado\n', status=503, content_type='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return HttpResponse(
+        prometheus_client.generate_latest(registry),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,289 @@
+"""
+Pagination classes for list endpoints
+Page-number pagination with an optional count-free mode, and keyset
+(cursor) pagination for deep scrolling over large tables
+"""
+
+import json
+import operator
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+MAX_PAGE_SIZE = getattr(settings, 'REST_FRAMEWORK_MAX_PAGE_SIZE', 100)
+
+
+class StandardPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with `page_size` support and a count-free mode.
+
+    `?count=false` skips the COUNT(*) query: the page is fetched with one
+    extra row to know whether a next page exists, and `count` is null.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.skip_count = request.query_params.get(self.count_query_param, '').lower() in ('0', 'false')
+        if not self.skip_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound('Página inválida.')
+
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+
+        self.request = request
+        self.page_number = page_number
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.skip_count:
+            return super().get_paginated_response(data)
+
+        return Response({
+            'count': None,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.skip_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if not self.skip_count:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a composite, unique ordering.
+
+    Unlike DRF's CursorPagination, the cursor stores the value of every
+    ordering field, so ties on the leading field (e.g. thousands of
+    registers sharing a report_date) do not turn into OFFSET scans.
+    Every page costs one indexed range query, never a COUNT(*).
+
+    The last ordering field must be unique (normally `id`). Nullable
+    fields are sorted with NULLs last.
+    """
+
+    ordering = ('-id',)
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        model = queryset.model
+        fields = self._get_fields(model)
+
+        values, reverse = self._decode_cursor(request, model, fields)
+
+        queryset = queryset.order_by(*self._get_ordering(fields, reverse))
+        if values is not None:
+            queryset = queryset.filter(self._get_keyset_filter(fields, values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        # Keys are read now: callers may reformat the rows before rendering
+        self.first_key = self._get_row_key(rows[0], fields) if rows else None
+        self.last_key = self._get_row_key(rows[-1], fields) if rows else None
+        if not rows:
+            self.has_next = self.has_previous = False
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self._build_link(self.last_key, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self._build_link(self.first_key, reverse=True)
+
+    # ------------------------------------------------------------------
+    # Ordering and keyset filter
+    # ------------------------------------------------------------------
+    def _get_fields(self, model):
+        """Returns [(name, descending, nullable)] for the ordering"""
+        fields = []
+        for item in self.ordering:
+            name = item.lstrip('-')
+            fields.append((name, item.startswith('-'), model._meta.get_field(name).null))
+        return fields
+
+    @staticmethod
+    def _get_ordering(fields, reverse):
+        ordering = []
+        for name, descending, nullable in fields:
+            descending = descending != reverse
+            if nullable:
+                # NULLs always go after the non-null values in forward order
+                expression = F(name).desc if descending else F(name).asc
+                ordering.append(expression(nulls_first=True) if reverse else expression(nulls_last=True))
+            else:
+                ordering.append(f'-{name}' if descending else name)
+        return ordering
+
+    @staticmethod
+    def _get_keyset_filter(fields, values, reverse):
+        """
+        Rows strictly after the cursor in query order:
+        (a > va) OR (a = va AND b > vb) OR ... for the effective directions.
+        """
+        clauses = []
+        prefix = Q()
+        for (name, descending, nullable), value in zip(fields, values):
+            descending = descending != reverse
+            nulls_at_end = not reverse
+
+            if value is None:
+                after = None if nulls_at_end else Q(**{f'{name}__isnull': False})
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if nullable and nulls_at_end:
+                    after |= Q(**{f'{name}__isnull': True})
+                equal = Q(**{name: value})
+
+            if after is not None:
+                clauses.append(prefix & after)
+            prefix &= equal
+
+        return reduce(operator.or_, clauses)
+
+    @staticmethod
+    def _get_row_key(row, fields):
+        if isinstance(row, dict):
+            return [row[name] for name, _, _ in fields]
+        return [getattr(row, name) for name, _, _ in fields]
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+    def _build_link(self, key, reverse):
+        payload = {
+            'v': [value.isoformat() if isinstance(value, (date, datetime)) else value for value in key],
+            'r': int(reverse),
+        }
+        encoded = urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def _decode_cursor(self, request, model, fields):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_values = payload['v']
+            if len(raw_values) != len(fields):
+                raise ValueError('cursor length mismatch')
+            values = [
+                None if raw is None else model._meta.get_field(name).to_python(raw)
+                for (name, _, _), raw in zip(fields, raw_values)
+            ]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+
+class RegisterKeysetPagination(KeysetPagination):
+    """Newest registers first, walking the report_date index"""
+    ordering = ('-report_date', '-id')
+
+
+class VehicleKeysetPagination(KeysetPagination):
+    """Most recently connected vehicles first, walking the last_connection index"""
+    ordering = ('-last_connection', '-id')
+
+
+class BitacoraKeysetPagination(KeysetPagination):
+    """Newest audit entries first (id grows with created_at)"""
+    ordering = ('-id',)
+
+
+class KeysetPaginationMixin:
+    """
+    ViewSet mixin: `?pagination=cursor` switches the request to keyset
+    pagination. Without it the default page-number pagination is kept.
+    """
+
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.pagination_class
+            request = getattr(self, 'request', None)
+            if (self.keyset_pagination_class is not None and request is not None
+                    and request.query_params.get('pagination') == 'cursor'):
+                pagination_class = self.keyset_pagination_class
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
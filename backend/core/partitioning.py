@@ -0,0 +1,295 @@
+"""
+Monthly range partitioning for the append-mostly tables
+Generates the DDL that turns a table into a RANGE-partitioned table by
+month (PostgreSQL declarative partitioning, MySQL RANGE COLUMNS), creates
+partitions ahead of time and drops emptied ones after archiving.
+
+Django keeps seeing `id` as the primary key. At the database level the key
+becomes (id, <date column>) because both engines require the partition
+column in every unique key; ids still come from the same identity /
+AUTO_INCREMENT column, so they stay unique.
+
+Engine notes:
+- PostgreSQL: the table is rebuilt (rename, create partitioned, copy,
+  drop old) in one transaction. Outgoing foreign keys and every index are
+  recreated from the Django model, except foreign keys to tables that are
+  already partitioned.
+- MySQL: InnoDB does not support foreign keys on partitioned tables, so
+  the table's foreign key constraints are dropped.
+
+On both engines the foreign keys referencing the converted table (e.g.
+Bitacora.register) are dropped too: they would need the partition column.
+From then on integrity is kept by the application (Django's CASCADE). Rows past the last month go to the `p_future`
+  (MAXVALUE) partition, which is split when new months are added.
+"""
+
+from datetime import date, datetime
+
+from django.apps import apps
+from django.db import models
+from django.db.models import Min
+
+
+# Alias -> (model label, partition column)
+PARTITIONED_TABLES = {
+    'registers': ('registers.Register', 'report_date'),
+    'bitacora': ('registers.Bitacora', 'created_at'),
+    'snapshots': ('vehicles.VehicleSnapshot', 'snapshot_date'),
+}
+
+SUPPORTED_VENDORS = ('postgresql', 'mysql')
+
+MYSQL_FUTURE_PARTITION = 'p_future'
+
+
+# ----------------------------------------------------------------------
+# Months
+# ----------------------------------------------------------------------
+def month_start(day):
+    """First day of the month containing `day` (date or datetime)"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    """`month` (a first-of-month date) shifted by `count` months"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(first, last):
+    """First-of-month dates from `first` to `last`, both included"""
+    month = month_start(first)
+    last = month_start(last)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def get_partition_spec(alias):
+    """Returns (model, partition column) for a PARTITIONED_TABLES alias"""
+    label, column = PARTITIONED_TABLES[alias]
+    return apps.get_model(label), column
+
+
+def oldest_month(model, column):
+    """Month of the oldest row, or None for an empty table"""
+    oldest = model._default_manager.aggregate(oldest=Min(column))['oldest']
+    return month_start(oldest) if oldest else None
+
+
+# ----------------------------------------------------------------------
+# Catalog
+# ----------------------------------------------------------------------
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT 1 FROM pg_partitioned_table pt '
+                'JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s',
+                [table],
+            )
+            return cursor.fetchone() is not None
+
+        cursor.execute(
+            'SELECT COUNT(*) FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL',
+            [table],
+        )
+        return cursor.fetchone()[0] > 0
+
+
+def existing_months(connection, table):
+    """Months that already have their own partition (by naming convention)"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits i '
+                'JOIN pg_class parent ON parent.oid = i.inhparent '
+                'JOIN pg_class child ON child.oid = i.inhrelid WHERE parent.relname = %s',
+                [table],
+            )
+            prefix = f'{table}_p'
+        else:
+            cursor.execute(
+                'SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL',
+                [table],
+            )
+            prefix = 'p'
+        names = [row[0] for row in cursor.fetchall()]
+
+    months = set()
+    for name in names:
+        suffix = name[len(prefix):] if name.startswith(prefix) else ''
+        if len(suffix) == 6 and suffix.isdigit():
+            months.add(date(int(suffix[:4]), int(suffix[4:]), 1))
+    return months
+
+
+def partition_row_count(connection, table, month):
+    """Rows stored in the partition of `month`"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'SELECT COUNT(*) FROM {quote(_pg_partition_name(table, month))}')
+        else:
+            cursor.execute(f'SELECT COUNT(*) FROM {quote(table)} PARTITION ({_mysql_partition_name(month)})')
+        return cursor.fetchone()[0]
+
+
+def _mysql_foreign_keys(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS '
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'",
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _incoming_foreign_keys(connection, table):
+    """(referencing table, constraint name) of the foreign keys pointing to `table`"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT src.relname, con.conname FROM pg_constraint con '
+                'JOIN pg_class src ON src.oid = con.conrelid '
+                "JOIN pg_class dst ON dst.oid = con.confrelid WHERE con.contype = 'f' AND dst.relname = %s",
+                [table],
+            )
+        else:
+            cursor.execute(
+                'SELECT TABLE_NAME, CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS '
+                'WHERE CONSTRAINT_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME = %s',
+                [table],
+            )
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+# ----------------------------------------------------------------------
+# DDL
+# ----------------------------------------------------------------------
+def _pg_partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def _mysql_partition_name(month):
+    return f'p{month:%Y%m}'
+
+
+def _bound(connection, model, column, month):
+    """SQL literal for the lower bound of `month` on the partition column"""
+    if isinstance(model._meta.get_field(column), models.DateTimeField):
+        # Datetimes are stored in UTC (USE_TZ)
+        suffix = '+00' if connection.vendor == 'postgresql' else ''
+        return f"'{month:%Y-%m-%d} 00:00:00{suffix}'"
+    return f"'{month:%Y-%m-%d}'"
+
+
+def _pg_partition_sql(connection, model, column, month):
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    return (
+        f'CREATE TABLE IF NOT EXISTS {quote(_pg_partition_name(table, month))} '
+        f'PARTITION OF {quote(table)} FOR VALUES FROM ({_bound(connection, model, column, month)}) '
+        f'TO ({_bound(connection, model, column, add_months(month, 1))})'
+    )
+
+
+def _mysql_partition_sql(connection, model, column, month):
+    return (
+        f'PARTITION {_mysql_partition_name(month)} VALUES LESS THAN '
+        f'({_bound(connection, model, column, add_months(month, 1))})'
+    )
+
+
+def convert_table_sql(connection, model, column, months):
+    """
+    Statements that turn the (unpartitioned) table of `model` into a table
+    partitioned by month on `column`, with one partition per month in
+    `months` (sorted first-of-month dates).
+    """
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column
+    drop_fk = 'DROP FOREIGN KEY' if connection.vendor == 'mysql' else 'DROP CONSTRAINT'
+    statements = [
+        f'ALTER TABLE {quote(source)} {drop_fk} {quote(name)}'
+        for source, name in _incoming_foreign_keys(connection, table)
+    ]
+
+    if connection.vendor == 'mysql':
+        statements += [
+            f'ALTER TABLE {quote(table)} DROP FOREIGN KEY {quote(name)}'
+            for name in _mysql_foreign_keys(connection, table)
+        ]
+        partitions = [_mysql_partition_sql(connection, model, column, month) for month in months]
+        partitions.append(f'PARTITION {MYSQL_FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)')
+        statements += [
+            f'ALTER TABLE {quote(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({quote(pk_column)}, {quote(column)})',
+            f'ALTER TABLE {quote(table)} PARTITION BY RANGE COLUMNS({quote(column)}) ({", ".join(partitions)})',
+        ]
+        return statements
+
+    legacy = f'{table}_legacy'
+    statements += [
+        f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}',
+        f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY '
+        f'INCLUDING GENERATED INCLUDING CONSTRAINTS) PARTITION BY RANGE ({quote(column)})',
+        f'ALTER TABLE {quote(table)} ADD PRIMARY KEY ({quote(pk_column)}, {quote(column)})',
+        f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT',
+    ]
+    statements += [_pg_partition_sql(connection, model, column, month) for month in months]
+    statements += [
+        f'INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}',
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{pk_column}'), "
+        f'COALESCE((SELECT MAX({quote(pk_column)}) FROM {quote(table)}), 0) + 1, false)',
+        f'DROP TABLE {quote(legacy)}',
+    ]
+
+    # Indexes, unique constraints and FKs come from the model, so they keep
+    # the names Django expects for later migrations
+    with connection.schema_editor(collect_sql=True) as schema_editor:
+        statements += [str(sql) for sql in schema_editor._model_indexes_sql(model)]
+        statements += [
+            str(constraint.create_sql(model, schema_editor)) for constraint in model._meta.constraints
+        ]
+        for field in model._meta.local_fields:
+            if not (field.remote_field and field.db_constraint):
+                continue
+            # A partitioned target has no unique key on the referenced column alone
+            if is_partitioned(connection, field.related_model._meta.db_table):
+                continue
+            statements.append(str(schema_editor._create_fk_sql(model, field, '_fk_%(to_table)s_%(to_column)s')))
+    return statements
+
+
+def create_partitions_sql(connection, model, column, months):
+    """Statements that add the partitions of `months` that do not exist yet"""
+    table = model._meta.db_table
+    missing = sorted(set(months) - existing_months(connection, table))
+
+    if connection.vendor == 'postgresql':
+        return [_pg_partition_sql(connection, model, column, month) for month in missing]
+
+    # MySQL only splits p_future: months before the last partition can't be added
+    existing = existing_months(connection, table)
+    if existing:
+        missing = [month for month in missing if month > max(existing)]
+    if not missing:
+        return []
+    partitions = [_mysql_partition_sql(connection, model, column, month) for month in missing]
+    partitions.append(f'PARTITION {MYSQL_FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)')
+    return [
+        f'ALTER TABLE {connection.ops.quote_name(table)} REORGANIZE PARTITION {MYSQL_FUTURE_PARTITION} '
+        f'INTO ({", ".join(partitions)})'
+    ]
+
+
+def drop_partition_sql(connection, table, month):
+    quote = connection.ops.quote_name
+    if connection.vendor == 'postgresql':
+        return f'DROP TABLE {quote(_pg_partition_name(table, month))}'
+    return f'ALTER TABLE {quote(table)} DROP PARTITION {_mysql_partition_name(month)}'
@@ -0,0 +1,44 @@
+"""
+Renderers for high-volume API responses
+Fast JSON rendering backed by orjson when it is installed
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Reuse DRF's encoder for everything orjson does not handle natively
+# (Decimal, lazy translations, UUID, timedelta, QuerySet, ...)
+_fallback_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = (
+    orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer.
+
+    Uses orjson (native datetime/date/UUID, Decimal through DRF's encoder)
+    and falls back to the stock renderer when orjson is not installed or
+    when the client requests indented output.
+
+    Enable per view with `renderer_classes = [FastJSONRenderer]` or
+    globally with the FAST_JSON_RENDERER environment variable.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(data, default=_fallback_encoder.default, option=ORJSON_OPTIONS)
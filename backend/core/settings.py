@@ -54,6 +54,8 @@ AUTH_USER_MODEL = 'organization.User'
 # MIDDLEWARE
 # ============================================================================
 MIDDLEWARE = [
+    'middleware.profiling.ProfilingMiddleware',  # Solo con PROFILING_ENABLED
+    'middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -64,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'middleware.error_handler.ErrorHandlerMiddleware',
     'middleware.logging.LoggingMiddleware',
+    'middleware.audit.AuditBatchMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -108,6 +111,30 @@ DATABASES = {
     }
 }
 
+# ============================================================================
+# CACHE CONFIGURATION
+# ============================================================================
+# Compartido entre workers y el proceso del ETL (que invalida al terminar):
+# Redis si hay REDIS_URL, si no archivos locales del servidor
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache',
+        }
+    }
+
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv('ANALYTICS_CACHE_TIMEOUT', '900'))  # segundos
+
 # ============================================================================
 # AUTHENTICATION & PASSWORD VALIDATION
 # ============================================================================
@@ -142,6 +169,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ============================================================================
 # DJANGO REST FRAMEWORK CONFIGURATION
 # ============================================================================
+# Tamaño máximo de página que puede pedir un cliente con ?page_size=
+REST_FRAMEWORK_MAX_PAGE_SIZE = int(os.getenv('REST_FRAMEWORK_MAX_PAGE_SIZE', 100))
+
+# Renderer JSON rápido (orjson) para todos los endpoints
+FAST_JSON_RENDERER = os.getenv('FAST_JSON_RENDERER', 'False') == 'True'
+
 REST_FRAMEWORK = {
     # Authentication
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -160,14 +193,18 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ),
 
-    # Pagination
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Pagination (?count=false omite el COUNT(*); ?pagination=cursor usa keyset)
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.StandardPageNumberPagination',
     'PAGE_SIZE': int(os.getenv('REST_FRAMEWORK_DEFAULT_PAGINATION_SIZE', 20)),
 
     # Default renderer
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer' if FAST_JSON_RENDERER
+        else 'rest_framework.renderers.JSONRenderer',
     ),
+    # Solo servimos JSON; liberamos ?format= para los endpoints que lo usan
+    # como parámetro propio (ej. summary-matrix?format=columnar)
+    'URL_FORMAT_OVERRIDE': None,
 
     # Throttling
     'DEFAULT_THROTTLE_CLASSES': (
@@ -264,20 +301,26 @@ LOGGING = {
             'backupCount': 10,
             'formatter': 'verbose',
         },
+        # Los loggers solo encolan; un hilo escribe en consola y archivos
+        # (el nombre debe ordenar después de los handlers que referencia)
+        'queue': {
+            '()': 'core.logging.QueueListenerHandler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file', 'cfg://handlers.error_file'],
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file', 'error_file'],
+            'handlers': ['queue'],
             'level': os.getenv('LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
         'services': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'api': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         }
@@ -302,6 +345,26 @@ ETL_BATCH_SIZE = 1000
 ETL_PAGE_SIZE = 1000
 ETL_TIMEOUT = 300  # seconds
 
+# Export Settings
+EXPORT_CHUNK_SIZE = 2000  # Filas por bloque del cursor del servidor
+
+# Profiling Settings (middleware.profiling)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.1'))  # Fracción de requests
+PROFILING_QUERY_BUDGET = int(os.getenv('PROFILING_QUERY_BUDGET', '50'))  # Queries por request
+PROFILING_LATENCY_BUDGET_MS = int(os.getenv('PROFILING_LATENCY_BUDGET_MS', '1000'))
+
+# Metrics Settings (core.metrics, /metrics)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # Bearer token para /metrics (sin token: 403 salvo DEBUG)
+
+# Audit Settings (apps.registers.audit)
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'False') == 'True'  # Bitácora escrita por un hilo de fondo
+
+# Retention Settings (manage.py archive_registers / partition_tables)
+REGISTER_RETENTION_MONTHS = int(os.getenv('REGISTER_RETENTION_MONTHS', '24'))
+ARCHIVE_DIR = BASE_DIR / 'archive'  # Destino de --format parquet
+PARTITION_MONTHS_AHEAD = 3  # Particiones mensuales creadas por adelantado
+
 # Security Settings
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
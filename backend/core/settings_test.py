@@ -0,0 +1,31 @@
+"""
+Settings for the automated test suite (pytest, see pyproject.toml)
+SQLite in memory, local cache and no log files, so the suite runs without
+MySQL/PostgreSQL, Redis or a writable logs/ directory.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Sin handlers de archivo ni hilo de la cola de logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+PROFILING_ENABLED = False
+AUDIT_ASYNC = False
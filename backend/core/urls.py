@@ -7,6 +7,7 @@ Routes for JWT authentication, API v1 endpoints with app routers
 
 from django.contrib import admin
 from django.urls import path, include
+from core.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -17,6 +18,9 @@ urlpatterns = [
     # Django Admin
     path('admin/', admin.site.urls),
 
+    # Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
     # Authentication (JWT)
     path('api/v1/auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/v1/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
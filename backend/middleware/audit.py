@@ -0,0 +1,19 @@
+"""
+Audit Middleware - Bitácora por lote en cada request
+"""
+
+from apps.registers.audit import audit_batch
+
+
+class AuditBatchMiddleware:
+    """
+    Acumula las entradas de bitácora del request y las escribe con un solo
+    bulk_create al confirmarse la transacción (ver apps.registers.audit).
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        with audit_batch():
+            return self.get_response(request)
@@ -17,20 +17,16 @@ class LoggingMiddleware(MiddlewareMixin):
     
     def process_request(self, request):
         """Registrar inicio de request"""
-        request._start_time = time.time()
-        logger.info(
-            f"{request.method} {request.path} - "
-            f"IP: {self._get_client_ip(request)}"
-        )
+        request._start_time = time.perf_counter()
+        logger.info('%s %s - IP: %s', request.method, request.path, self._get_client_ip(request))
     
     def process_response(self, request, response):
         """Registrar fin de request con duración"""
         if hasattr(request, '_start_time'):
-            duration = time.time() - request._start_time
+            duration = time.perf_counter() - request._start_time
             logger.info(
-                f"{request.method} {request.path} - "
-                f"Status: {response.status_code} - "
-                f"Duration: {duration:.3f}s"
+                '%s %s - Status: %s - Duration: %.3fs',
+                request.method, request.path, response.status_code, duration
             )
         
         return response
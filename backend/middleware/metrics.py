@@ -0,0 +1,28 @@
+"""
+Metrics Middleware - Conteo y latencia por vista para /metrics
+"""
+
+import time
+
+from core.metrics import API_REQUEST_DURATION, API_REQUESTS
+
+
+class MetricsMiddleware:
+    """
+    Registra cada request en core.metrics por método, vista y status.
+    La vista es el nombre de la ruta (ej. 'register-list'), no el path,
+    para que los ids en la URL no disparen la cardinalidad.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        API_REQUEST_DURATION.labels(request.method, view).observe(time.perf_counter() - start)
+        API_REQUESTS.labels(request.method, view, str(response.status_code)).inc()
+        return response
@@ -0,0 +1,104 @@
+"""
+Profiling Middleware - Queries, tiempo de BD y de render por request
+Opt-in con PROFILING_ENABLED; muestrea PROFILING_SAMPLE_RATE de los requests.
+"""
+
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('api.profiling')
+
+
+class QueryStats:
+    """execute_wrapper que cuenta queries y acumula su tiempo"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class ProfilingMiddleware:
+    """
+    Registra por request (muestreado) una línea JSON con:
+    queries, db_ms, render_ms (render del Response de DRF), duration_ms y
+    response_bytes. Los requests que pasan PROFILING_QUERY_BUDGET o
+    PROFILING_LATENCY_BUDGET_MS se registran como WARNING con `over_budget`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.query_budget = settings.PROFILING_QUERY_BUDGET
+        self.latency_budget_ms = settings.PROFILING_LATENCY_BUDGET_MS
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        queries = QueryStats()
+        request._profiling_render = [0.0, None]
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        self._log(request, response, queries, duration_ms)
+        return response
+
+    def process_template_response(self, request, response):
+        """Mide el render (serialización a JSON) de los Response de DRF"""
+        render = getattr(request, '_profiling_render', None)
+        if render is not None:
+            render[1] = time.perf_counter()
+
+            def rendered(response):
+                render[0] += time.perf_counter() - render[1]
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def _log(self, request, response, queries, duration_ms):
+        over_budget = []
+        if queries.count > self.query_budget:
+            over_budget.append('queries')
+        if duration_ms > self.latency_budget_ms:
+            over_budget.append('latency')
+
+        match = getattr(request, 'resolver_match', None)
+        user = getattr(request, 'user', None)
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'duration_ms': round(duration_ms, 2),
+            'queries': queries.count,
+            'db_ms': round(queries.duration * 1000, 2),
+            'render_ms': round(request._profiling_render[0] * 1000, 2),
+            'response_bytes': None if response.streaming else len(response.content),
+            'over_budget': over_budget,
+        }
+
+        level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(entry))
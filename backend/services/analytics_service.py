@@ -10,9 +10,9 @@ from datetime import datetime, timedelta
 from django.db.models import Q, Count, Sum, Avg
 from django.db.models.functions import TruncDate
 
-from apps.vehicles.models import Vehicle
+from apps.vehicles.models import Vehicle, Contrato
 from apps.registers.models import Register
-from apps.organization.models import Group, Contrato
+from apps.organization.models import Group
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +65,7 @@ class AnalyticsService:
         if not end_date:
             end_date = datetime.now()
         
-        logger.info(f"Generando matriz de resumen ({start_date.date()} a {end_date.date()})")
+        logger.info('Generando matriz de resumen (%s a %s)', start_date.date(), end_date.date())
         
         # Obtener todas las fechas en el rango
         dates = self._get_date_range(start_date, end_date)
@@ -258,14 +258,7 @@ class AnalyticsService:
         Returns:
             List[Dict]: Top vehículos
         """
-        start_date = datetime.now() - timedelta(days=days)
-        
-        top_vehicles = Vehicle.objects.filter(
-            registers__created_at__gte=start_date,
-            is_active=True
-        ).annotate(
-            disconnection_count=Count('registers')
-        ).order_by('-disconnection_count')[:limit]
+        top_vehicles = Vehicle.objects.top_disconnected(days).select_related('group')[:limit]
         
         return [
             {
@@ -273,6 +266,8 @@ class AnalyticsService:
                 'vehicle_id': v.vehicle_id,
                 'group': v.group.group_description,
                 'disconnection_count': v.disconnection_count,
+                'disconnection_streak': v.disconnection_streak,
+                'dark_since': v.dark_since,
                 'last_connection': v.last_connection
             }
             for v in top_vehicles
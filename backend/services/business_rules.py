@@ -46,21 +46,21 @@ class DisconnectionRules:
         try:
             # Regla: Si velocidad > umbral Y está fuera de geocerca → trayecto
             if speed > self.MIN_SPEED_THRESHOLD and not in_geofence:
-                logger.info(
-                    f"Vehículo {vehicle.vin[:8]}... clasificado como "
-                    f"DESCONEXIÓN EN TRAYECTO (speed={speed})"
+                logger.debug(
+                    'Vehículo %s... clasificado como DESCONEXIÓN EN TRAYECTO (speed=%s)',
+                    vehicle.vin[:8], speed
                 )
                 return Register.DisconnectionType.DISCONNECTION_IN_ROUTE
             
             # Si no cumple → está en base
-            logger.info(
-                f"Vehículo {vehicle.vin[:8]}... clasificado como "
-                f"DESCONEXIÓN EN BASE ({geofence_name})"
+            logger.debug(
+                'Vehículo %s... clasificado como DESCONEXIÓN EN BASE (%s)',
+                vehicle.vin[:8], geofence_name
             )
             return Register.DisconnectionType.DISCONNECTION_AT_BASE
         
         except Exception as e:
-            logger.error(f"Error clasificando desconexión: {str(e)}")
+            logger.error('Error clasificando desconexión: %s', e)
             return Register.DisconnectionType.UNKNOWN
     
     def is_disconnection(self, vehicle_data: dict) -> bool:
@@ -0,0 +1,507 @@
+"""
+Import Engine - Carga masiva de telemetría
+Motor único para ETLService y VehicleETLService: mismas reglas de mapeo
+telemetría → modelos, por lotes y con mapas de dimensiones precargados.
+"""
+
+import logging
+import math
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.organization.models import Client, Distribuidor, Group
+from apps.registers.models import Register
+from apps.vehicles.models import Contrato, Geofence, Vehicle, VehicleSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+# Formatos aceptados además de ISO 8601 (datetime.fromisoformat)
+DATETIME_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d',
+]
+
+# Campos de Vehicle que escribe cada carga
+VEHICLE_FIELDS = [
+    'vin', 'group', 'distribuidor', 'geofence', 'contrato',
+    'last_latitude', 'last_longitude', 'last_connection', 'speed',
+]
+
+
+def parse_datetime(dt_string: Optional[str]) -> Optional[datetime]:
+    """
+    Parsea la fecha/hora de telemetría (ISO 8601 con o sin zona, o los
+    formatos de DATETIME_FORMATS) a un datetime con zona.
+
+    Returns:
+        datetime o None si no se puede parsear
+    """
+    if not dt_string or not isinstance(dt_string, str):
+        return None
+
+    try:
+        dt = datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
+    except ValueError:
+        dt = None
+        for fmt in DATETIME_FORMATS:
+            try:
+                dt = datetime.strptime(dt_string, fmt)
+                break
+            except ValueError:
+                continue
+
+    if dt is None:
+        logger.warning('No se pudo parsear fecha: %s', dt_string)
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def _is_missing(value) -> bool:
+    """None o NaN (los registros del ETL vienen de un DataFrame)"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _number(value, cast, default=None):
+    """Valor numérico del registro (default si falta); ValueError si no es numérico"""
+    if _is_missing(value) or value == '':
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'valor no numérico: {value!r}')
+
+
+def _geofence_name(record: Dict) -> Optional[str]:
+    """Nombre de geocerca del registro (None si viene vacío)"""
+    name = record.get('geofence_name')
+    return None if _is_missing(name) or not name else name
+
+
+class ImportEngine:
+    """
+    Carga de registros de telemetría por lotes.
+
+    Por cada lote (ETL_BATCH_SIZE registros):
+    - Clientes, grupos y geocercas faltantes: un bulk_create por tabla sobre
+      los mapas precargados (llave externa → instancia).
+    - Vehículos: un in_bulk por vehicle_id, bulk_create de los nuevos y
+      bulk_update de los existentes.
+    - Registros de desconexión: uno por vehículo y día, en un bulk_create.
+    Las fotos diarias se guardan al final con un upsert.
+
+    Reglas (las del ETL):
+    - El vehículo queda en el distribuidor por defecto ("Sin Distribuidor").
+    - El contrato se enlaza por VIN cuando existe; si no, se conserva.
+    - Desconectado: última comunicación anterior al día actual.
+    - Trayecto si speed > 0 y sin geocerca; si no, base.
+
+    Errores: cada registro se valida y normaliza antes de cargarse (speed
+    vacío = 0, coordenadas vacías = None); los inválidos se cuentan en
+    `errors` y se omiten. Si un lote falla al escribirse, se reintenta
+    registro por registro para aislar al que falla.
+
+    Uso:
+        engine = ImportEngine()
+        stats = engine.run(records)
+        engine.error_messages  # detalle de los registros con error
+    """
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or getattr(settings, 'ETL_BATCH_SIZE', 1000)
+        # report_date/snapshot_date guardan la fecha local
+        self.today = timezone.localdate()
+        self.error_messages: List[str] = []
+
+        self.clients: Dict[int, Client] = {}
+        self.groups: Dict[int, Group] = {}
+        self.geofences: Dict[str, Geofence] = {}
+        self.distribuidor: Optional[Distribuidor] = None
+        # Foto diaria por vehículo; si el feed repite un vehículo gana el último
+        self.snapshots: Dict[int, VehicleSnapshot] = {}
+
+    def run(self, records: Iterable[Dict]) -> Dict:
+        """
+        Procesa los registros de telemetría.
+
+        Args:
+            records: Iterable de registros (dicts del endpoint)
+
+        Returns:
+            Dict: Estadísticas del procesamiento
+        """
+        stats = {
+            'clients_created': 0,
+            'groups_created': 0,
+            'geofences_created': 0,
+            'vehicles_created': 0,
+            'vehicles_updated': 0,
+            'registers_created': 0,
+            'disconnections_route': 0,
+            'disconnections_base': 0,
+            'snapshots_saved': 0,
+            'errors': 0
+        }
+
+        self.distribuidor = self._get_default_distribuidor()
+
+        iterator = iter(records)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                break
+            self._load_batch(batch, stats)
+
+        stats['snapshots_saved'] = self._save_snapshots()
+
+        logger.info(
+            'Carga completada - vehículos creados: %s, actualizados: %s, registros: %s, errores: %s',
+            stats['vehicles_created'], stats['vehicles_updated'], stats['registers_created'], stats['errors']
+        )
+        return stats
+
+    # ========================================================================
+    # LOTE
+    # ========================================================================
+    def _load_batch(self, batch: List[Dict], stats: Dict) -> None:
+        valid = []
+        for record in batch:
+            try:
+                valid.append(self._clean(record))
+            except ValueError as e:
+                self._error(record, str(e), stats)
+
+        if not valid:
+            return
+
+        try:
+            self._load_atomic(valid, stats)
+        except Exception as e:
+            logger.warning('Lote de %s registros falló (%s); se reintenta por registro', len(valid), e)
+            for record in valid:
+                try:
+                    self._load_atomic([record], stats)
+                except Exception as e:
+                    self._error(record, str(e), stats)
+
+    def _load_atomic(self, records: List[Dict], stats: Dict) -> None:
+        """
+        Carga los registros en un savepoint. Si falla, las estadísticas y
+        los mapas en memoria vuelven a como estaban (sus filas se revirtieron).
+        """
+        saved = (dict(stats), dict(self.clients), dict(self.groups), dict(self.geofences), dict(self.snapshots))
+        try:
+            with transaction.atomic():
+                stats['clients_created'] += self._load_clients(records)
+                stats['groups_created'] += self._load_groups(records)
+                stats['geofences_created'] += self._load_geofences(records)
+
+                vehicles = self._load_vehicles(records, stats)
+                self._load_registers(records, vehicles, stats)
+        except Exception:
+            stats.clear()
+            stats.update(saved[0])
+            self.clients, self.groups, self.geofences, self.snapshots = saved[1:]
+            raise
+
+    @staticmethod
+    def _clean(record: Dict) -> Dict:
+        """
+        Valida y normaliza un registro del feed.
+
+        Raises:
+            ValueError: Faltan campos obligatorios o un valor no es numérico
+        """
+        missing = [
+            field for field in ('vehicle_id', 'vin', 'client_id', 'group_id')
+            if _is_missing(record.get(field))
+        ]
+        if missing:
+            raise ValueError(f"faltan campos: {', '.join(missing)}")
+
+        cleaned = dict(record)
+        for field in ('vehicle_id', 'client_id', 'group_id'):
+            cleaned[field] = _number(record[field], int)
+        cleaned['vin'] = str(record['vin'])
+        cleaned['speed'] = _number(record.get('speed'), float, default=0.0)
+        cleaned['latitude'] = _number(record.get('latitude'), float)
+        cleaned['longitude'] = _number(record.get('longitude'), float)
+        return cleaned
+
+    def _error(self, record: Dict, message: str, stats: Dict) -> None:
+        error_msg = f"Error procesando registro {record.get('vehicle_id')}: {message}"
+        logger.error(error_msg)
+        self.error_messages.append(error_msg)
+        stats['errors'] += 1
+
+    # ========================================================================
+    # DIMENSIONES
+    # ========================================================================
+    def _load_clients(self, records: List[Dict]) -> int:
+        """Clientes del lote: los faltantes se crean en un solo INSERT"""
+        names = {}
+        for record in records:
+            client_id = record['client_id']
+            names.setdefault(client_id, record.get('client_name', f'Cliente {client_id}'))
+
+        return self._load_dimension(
+            Client, 'client_id', self.clients, names,
+            lambda client_id, name: Client(client_id=client_id, client_description=name),
+        )
+
+    def _load_groups(self, records: List[Dict]) -> int:
+        """Grupos del lote (con el cliente del primer registro que los trae)"""
+        values = {}
+        for record in records:
+            group_id = record['group_id']
+            values.setdefault(group_id, (
+                record.get('group_name', f'Grupo {group_id}'),
+                self.clients[record['client_id']],
+            ))
+
+        return self._load_dimension(
+            Group, 'group_id', self.groups, values,
+            lambda group_id, value: Group(group_id=group_id, group_description=value[0], client=value[1]),
+        )
+
+    def _load_geofences(self, records: List[Dict]) -> int:
+        names = {_geofence_name(record): None for record in records if _geofence_name(record)}
+
+        return self._load_dimension(
+            Geofence, 'geo_name', self.geofences, names,
+            lambda geo_name, _: Geofence(geo_name=geo_name),
+        )
+
+    def _load_dimension(self, model, key_field: str, cache: Dict, values: Dict, build) -> int:
+        """
+        Completa `cache` (llave → instancia) con las llaves de `values`:
+        lee las que ya existen y crea el resto con un bulk_create.
+
+        Returns:
+            Número de filas creadas
+        """
+        pending = [key for key in values if key not in cache]
+        if not pending:
+            return 0
+
+        cache.update(model.objects.in_bulk(pending, field_name=key_field))
+        missing = [key for key in pending if key not in cache]
+        if not missing:
+            return 0
+
+        # ignore_conflicts: otra carga pudo crearlas entre la lectura y el INSERT
+        model.objects.bulk_create([build(key, values[key]) for key in missing], ignore_conflicts=True)
+        cache.update(model.objects.in_bulk(missing, field_name=key_field))
+        logger.info('%s creados: %s', model._meta.verbose_name_plural, len(missing))
+        return len(missing)
+
+    def _get_default_distribuidor(self) -> Distribuidor:
+        """
+        Obtiene o crea un distribuidor por defecto.
+        En el futuro esto se obtendrá del Excel o API.
+        """
+        distribuidor, created = Distribuidor.objects.get_or_create(
+            distribuidor_id=0,
+            defaults={
+                'distribuidor_name': 'Sin Distribuidor'
+            }
+        )
+
+        if created:
+            logger.info("Distribuidor por defecto creado")
+
+        return distribuidor
+
+    # ========================================================================
+    # VEHÍCULOS
+    # ========================================================================
+    def _load_vehicles(self, records: List[Dict], stats: Dict) -> Dict[int, Vehicle]:
+        """
+        Crea o actualiza los vehículos del lote.
+
+        Returns:
+            Dict vehicle_id externo → Vehicle (ya con pk)
+        """
+        vehicle_ids = {record['vehicle_id'] for record in records}
+        vehicles = Vehicle.objects.in_bulk(vehicle_ids, field_name='vehicle_id')
+        contratos = self._contratos_by_vin({record['vin'] for record in records})
+
+        to_create = {}
+        to_update = {}
+        now = timezone.now()
+
+        for record in records:
+            vehicle_id = record['vehicle_id']
+            vehicle = vehicles.get(vehicle_id)
+            if vehicle is None:
+                vehicle = Vehicle(vehicle_id=vehicle_id)
+                vehicles[vehicle_id] = vehicle
+                to_create[vehicle_id] = vehicle
+                stats['vehicles_created'] += 1
+            else:
+                if vehicle_id not in to_create:
+                    to_update[vehicle_id] = vehicle
+                stats['vehicles_updated'] += 1
+
+            contrato = contratos.get(record['vin'])
+            vehicle.vin = record['vin']
+            vehicle.group = self.groups[record['group_id']]
+            vehicle.distribuidor = self.distribuidor
+            vehicle.geofence = self.geofences.get(_geofence_name(record))
+            if contrato is not None:
+                vehicle.contrato = contrato
+            vehicle.last_latitude = record.get('latitude')
+            vehicle.last_longitude = record.get('longitude')
+            vehicle.last_connection = parse_datetime(record.get('last_communication_time'))
+            vehicle.speed = record['speed']
+            vehicle.updated_at = now
+
+        if to_create:
+            created = list(to_create.values())
+            Vehicle.objects.bulk_create(created)
+            if created[0].pk is None:
+                # Sin RETURNING (MySQL): leer los ids por vehicle_id
+                ids = dict(Vehicle.objects.filter(vehicle_id__in=list(to_create)).values_list('vehicle_id', 'id'))
+                for vehicle in created:
+                    vehicle.pk = ids[vehicle.vehicle_id]
+
+        if to_update:
+            Vehicle.objects.bulk_update(
+                list(to_update.values()), VEHICLE_FIELDS + ['updated_at'], batch_size=self.batch_size
+            )
+
+        return vehicles
+
+    @staticmethod
+    def _contratos_by_vin(vins) -> Dict[str, Contrato]:
+        """Contrato más reciente (mayor contrato_id) de cada VIN"""
+        contratos = {}
+        for contrato in Contrato.objects.filter(vin__in=vins).order_by('contrato_id'):
+            contratos[contrato.vin] = contrato
+        return contratos
+
+    # ========================================================================
+    # DESCONEXIONES Y FOTOS DIARIAS
+    # ========================================================================
+    def is_disconnected(self, record: Dict) -> bool:
+        """
+        Determina si un vehículo está desconectado.
+
+        Regla: last_communication_time < día actual
+        """
+        last_comm = parse_datetime(record.get('last_communication_time'))
+
+        if not last_comm:
+            return False
+
+        return timezone.localdate(last_comm) < self.today
+
+    def _load_registers(self, records: List[Dict], vehicles: Dict[int, Vehicle], stats: Dict) -> None:
+        """
+        Un registro de desconexión por vehículo y día.
+
+        Lógica de problema:
+        - Si speed > 0 AND geofence_name == null → "Desconexión en trayecto"
+        - Caso contrario → "Desconexión en base"
+
+        Valores por defecto:
+        - tipo = "MAL FUNCIONAMIENTO"
+        - estatus_final = "POSIBLE MANIPULACIÓN" (base) o "PERDIDA DE SEÑAL" (trayecto)
+        - responsable = "SIN ESTATUS DEL DISTRIBUIDOR"
+        """
+        registered = set(
+            Register.objects.filter(
+                report_date=self.today,
+                vehicle_id__in=[vehicle.pk for vehicle in vehicles.values()]
+            ).values_list('vehicle_id', flat=True)
+        )
+
+        registers = []
+        for record in records:
+            vehicle = vehicles[record['vehicle_id']]
+            is_disconnected = self.is_disconnected(record)
+
+            self.snapshots[vehicle.pk] = VehicleSnapshot(
+                snapshot_date=self.today,
+                vehicle=vehicle,
+                group_id=vehicle.group_id,
+                contrato_id=vehicle.contrato_id,
+                geofence_id=vehicle.geofence_id,
+                connected=vehicle.last_connection is not None and not is_disconnected,
+                speed_bucket=VehicleSnapshot.speed_bucket_for(record['speed']),
+            )
+
+            if not is_disconnected:
+                continue
+
+            if record['speed'] > 0 and not _geofence_name(record):
+                problem = "Desconexión en trayecto"
+                disconnection_kind = Register.KIND_ROUTE
+                estatus_final = Register.ESTATUS_PERDIDA_SEÑAL
+                stats['disconnections_route'] += 1
+            else:
+                problem = "Desconexión en base"
+                disconnection_kind = Register.KIND_BASE
+                estatus_final = Register.ESTATUS_POSIBLE_MANIPULACION
+                stats['disconnections_base'] += 1
+
+            # Solo un registro por vehículo y día
+            if vehicle.pk in registered:
+                continue
+            registered.add(vehicle.pk)
+
+            registers.append(Register(
+                vehicle=vehicle,
+                report_date=self.today,
+                distribuidor=self.distribuidor,
+                # Grupo de este registro: el vehículo puede repetirse en el lote
+                group_id=self.groups[record['group_id']].pk,
+                contrato_id=vehicle.contrato_id,
+                platform_client=record.get('client_name', ''),
+                last_connection=parse_datetime(record.get('last_communication_time')),
+                problem=problem,
+                disconnection_kind=disconnection_kind,
+                tipo=Register.TIPO_MAL_FUNCIONAMIENTO,
+                estatus_final=estatus_final,
+                responsable=Register.RESPONSABLE_SIN_ESTATUS_DISTRIBUIDOR,
+                comentario=''
+            ))
+
+        if registers:
+            Register.objects.bulk_create(registers, batch_size=self.batch_size)
+            stats['registers_created'] += len(registers)
+
+    def _save_snapshots(self) -> int:
+        """
+        Inserta las fotos diarias con bulk_create; si el ETL ya corrió hoy,
+        el conflicto en (vehicle, snapshot_date) actualiza la fila existente.
+        """
+        snapshots = list(self.snapshots.values())
+        if not snapshots:
+            return 0
+
+        # MySQL resuelve el conflicto por cualquier llave única y no acepta
+        # unique_fields; PostgreSQL/SQLite lo requieren
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['vehicle', 'snapshot_date']
+
+        VehicleSnapshot.objects.bulk_create(
+            snapshots,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=['group', 'contrato', 'geofence', 'connected', 'speed_bucket'],
+        )
+
+        logger.info('Fotos diarias guardadas: %s', len(snapshots))
+        return len(snapshots)
@@ -0,0 +1,223 @@
+"""
+Fixtures for the API query-count suite
+A realistic fleet is loaded once per test session; each test runs in a
+transaction that is rolled back, with an empty cache, and every request is
+made through `api` so it asserts a query budget and records its latency.
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.organization.models import Client, Distribuidor, Group, User
+from apps.registers.models import Bitacora, Register
+from apps.vehicles.services import DisconnectionCounterService
+from apps.vehicles.models import Contrato, Geofence, Vehicle, VehicleSnapshot
+
+# Tamaño de la flota: suficiente para que una página completa (20 filas) y
+# los agregados por grupo/día pasen por muchas filas relacionadas
+DISTRIBUIDORES = 3
+CLIENTS = 4
+GROUPS_PER_CLIENT = 3
+VEHICLES_PER_GROUP = 50
+DAYS = 30
+DISCONNECTION_RATE = 0.3
+
+TIMINGS = []
+
+
+# ============================================================================
+# DATOS
+# ============================================================================
+def build_fleet():
+    """Distribuidores, clientes, grupos, vehículos, 30 días de registros con bitácora y fotos diarias"""
+    rng = random.Random(13)
+    now = timezone.now()
+    today = timezone.localdate()
+
+    distribuidores = [
+        Distribuidor.objects.create(distribuidor_id=i, distribuidor_name=f'Distribuidor {i}')
+        for i in range(DISTRIBUIDORES)
+    ]
+    geofences = [Geofence.objects.create(geo_name=f'Base {i}') for i in range(5)]
+
+    vehicles = []
+    for ci in range(CLIENTS):
+        client = Client.objects.create(client_id=ci + 1, client_description=f'Cliente {ci + 1}')
+        for gi in range(GROUPS_PER_CLIENT):
+            group = Group.objects.create(
+                group_id=(ci + 1) * 100 + gi, group_description=f'Grupo {ci + 1}-{gi}', client=client
+            )
+            for vi in range(VEHICLES_PER_GROUP):
+                vehicle_id = group.group_id * 1000 + vi
+                vin = f'SZ{vehicle_id:015d}'
+                vehicles.append(Vehicle(
+                    vehicle_id=vehicle_id,
+                    vin=vin,
+                    group=group,
+                    distribuidor=distribuidores[vi % DISTRIBUIDORES],
+                    geofence=geofences[vi % 5] if vi % 2 else None,
+                    contrato=Contrato.objects.create(contrato_id=vehicle_id, vin=vin, contrato=f'C-{vehicle_id}')
+                    if vi % 3 == 0 else None,
+                    last_connection=now - timedelta(hours=rng.randint(0, 24 * 10)),
+                    speed=rng.choice([0, 0, 15.5, 60]),
+                ))
+    Vehicle.objects.bulk_create(vehicles)
+    vehicles = list(Vehicle.objects.all())
+
+    problems = ['Desconexión en trayecto', 'Desconexión en base']
+    statuses = [Register.ESTATUS_BASE, Register.ESTATUS_TALLER, '']
+    snapshots = []
+    for day in range(DAYS):
+        report_date = today - timedelta(days=day)
+        registers = []
+        for vehicle in vehicles:
+            snapshots.append(VehicleSnapshot(
+                snapshot_date=report_date,
+                vehicle=vehicle,
+                group_id=vehicle.group_id,
+                contrato_id=vehicle.contrato_id,
+                connected=rng.random() > DISCONNECTION_RATE,
+                speed_bucket=VehicleSnapshot.speed_bucket_for(vehicle.speed),
+            ))
+            if rng.random() < DISCONNECTION_RATE:
+                problem = rng.choice(problems)
+                registers.append(Register(
+                    vehicle=vehicle,
+                    distribuidor_id=vehicle.distribuidor_id,
+                    group_id=vehicle.group_id,
+                    contrato_id=vehicle.contrato_id,
+                    last_connection=now - timedelta(days=day + 1),
+                    problem=problem,
+                    disconnection_kind=Register.kind_from_problem(problem),
+                    estatus_final=rng.choice(statuses),
+                ))
+        Register.objects.bulk_create(registers)
+        # report_date es auto_now_add: se fija después de insertar
+        Register.objects.filter(pk__in=[register.pk for register in registers]).update(report_date=report_date)
+    VehicleSnapshot.objects.bulk_create(snapshots, batch_size=2000)
+
+    Bitacora.objects.bulk_create(
+        [Bitacora(register_id=pk, comentario='Registro creado') for pk in Register.objects.values_list('pk', flat=True)],
+        batch_size=2000
+    )
+    DisconnectionCounterService.rebuild_counters()
+
+
+@pytest.fixture(scope='session')
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Carga la flota una sola vez; cada test corre en una transacción que se revierte"""
+    with django_db_blocker.unblock():
+        build_fleet()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Cada test mide el camino frío (sin resultados de analytics cacheados)"""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def evening(monkeypatch):
+    """
+    timezone.now() fijo a las 20:00 de hoy en Ciudad de México, cuando en
+    UTC ya es el día siguiente (report_date guarda la fecha local).
+    """
+    # Como timezone.now(): aware en UTC
+    now = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()) + timedelta(hours=20)).astimezone(dt_timezone.utc)
+    assert now.date() != timezone.localdate(now)
+    monkeypatch.setattr(timezone, 'now', lambda: now)
+    return now
+
+
+# ============================================================================
+# CLIENTES
+# ============================================================================
+@pytest.fixture
+def admin_user(db):
+    return User.objects.create_user(username='admin', password='admin', is_superuser=True, role=User.ADMIN)
+
+
+@pytest.fixture
+def distribuidor_user(db):
+    return User.objects.create_user(
+        username='distribuidor', password='distribuidor', role=User.DISTRIBUIDOR, distribuidor_id=1
+    )
+
+
+@pytest.fixture
+def admin_client(admin_user):
+    client = APIClient()
+    client.force_authenticate(admin_user)
+    return client
+
+
+@pytest.fixture
+def distribuidor_client(distribuidor_user):
+    client = APIClient()
+    client.force_authenticate(distribuidor_user)
+    return client
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+@pytest.fixture
+def api(django_assert_max_num_queries, django_capture_on_commit_callbacks, record_property):
+    """
+    Makes a request and asserts it runs at most `max_queries` queries.
+    Streaming responses are consumed (and kept, so the test can read
+    them again) and on_commit callbacks (bitácora flush) are run inside
+    the measurement, as in production. The latency
+    is recorded as a test property (junit XML) and in the session summary.
+
+        response = api(admin_client, 'get', '/api/v1/registers/', max_queries=3)
+    """
+    def request(client, method, url, max_queries, **kwargs):
+        with django_assert_max_num_queries(max_queries) as queries, \
+                django_capture_on_commit_callbacks(execute=True):
+            start = time.perf_counter()
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                # Se consume dentro de la medición y se deja para releerlo
+                response.streaming_content = [b''.join(response.streaming_content)]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        label = f'{method.upper()} {url}'
+        record_property('duration_ms', round(elapsed_ms, 2))
+        TIMINGS.append((elapsed_ms, len(queries), response.status_code, label))
+        return response
+
+    return request
+
+
+@pytest.fixture
+def follow_cursor(admin_client):
+    """Recorre `next` desde una primera página y regresa los ids de todas las páginas"""
+    def follow(response):
+        ids = []
+        while True:
+            payload = response.json()
+            ids += [row['id'] for row in payload['results']]
+            if not payload['next']:
+                return ids
+            response = admin_client.get(payload['next'])
+            assert response.status_code == 200
+
+    return follow
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not TIMINGS:
+        return
+    terminalreporter.section('API timings (slowest first)')
+    for elapsed_ms, queries, status, label in sorted(TIMINGS, reverse=True)[:15]:
+        terminalreporter.write_line(f'{elapsed_ms:8.1f} ms  {queries:3d} queries  {status}  {label}')
@@ -0,0 +1,107 @@
+"""
+Query budgets: analytics views
+Every test starts with an empty cache, so the budgets cover the full
+computation, not a cached response.
+"""
+
+from datetime import date
+
+import pytest
+from django.utils import timezone
+
+from apps.analytics.services import TopDisconnectedService
+from apps.organization.models import Group
+from apps.registers.models import Register
+
+pytestmark = pytest.mark.django_db
+
+
+def test_summary_matrix(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/analytics/summary-matrix/', max_queries=5)
+    assert response.status_code == 200
+
+
+def test_summary_matrix_columnar(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/analytics/summary-matrix/?format=columnar', max_queries=5)
+    assert response.status_code == 200
+    size = len(response.data['dates'])
+    contracts = [contract for group in response.data['groups'] for contract in group['data']]
+    assert contracts
+    for contract in contracts:
+        for key in ('totals', 'connected', 'disconnected', 'route', 'base'):
+            assert len(contract[key]) == size
+    date_range = (date.fromisoformat(response.data['start_date']), date.fromisoformat(response.data['end_date']))
+    assert sum(sum(contract['disconnected']) for contract in contracts) == Register.objects.filter(
+        report_date__range=date_range
+    ).count()
+
+
+def test_summary_matrix_scoped(api, distribuidor_client):
+    response = api(distribuidor_client, 'get', '/api/v1/analytics/summary-matrix/', max_queries=5)
+    assert response.status_code == 200
+
+
+def test_group_stats(api, admin_client):
+    group = Group.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/analytics/group/{group.pk}/stats/', max_queries=7)
+    assert response.status_code == 200
+
+
+def test_top_disconnected(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/analytics/top-disconnected/?limit=100', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.data['vehicles']) == 100
+
+
+def test_top_disconnected_cached(api, admin_client):
+    admin_client.get('/api/v1/analytics/top-disconnected/?limit=100')
+    response = api(admin_client, 'get', '/api/v1/analytics/top-disconnected/?limit=100', max_queries=0)
+    assert response.status_code == 200
+
+
+def test_top_disconnected_today_in_the_evening(evening):
+    # Ventana de 1 día (cuenta registros): debe empezar en la fecha local
+    vehicles_today = Register.objects.filter(report_date=timezone.localdate()).values('vehicle_id').distinct().count()
+    top = TopDisconnectedService.get_top(days=1, limit=TopDisconnectedService.MAX_LIMIT)
+    assert len(top) == min(vehicles_today, TopDisconnectedService.MAX_LIMIT)
+    assert {vehicle['disconnection_count'] for vehicle in top} == {1}
+
+
+def _assert_series(data, registers):
+    """Arreglos alineados con `dates` y desconexiones que suman los registros del rango"""
+    size = len(data['dates'])
+    assert data['series']
+    for entry in data['series']:
+        for key in ('connected', 'disconnected', 'disconnected_vehicles', 'route', 'base'):
+            assert len(entry[key]) == size
+    date_range = (date.fromisoformat(data['start_date']), date.fromisoformat(data['end_date']))
+    assert sum(sum(entry['disconnected']) for entry in data['series']) == registers.filter(
+        report_date__range=date_range
+    ).count()
+
+
+@pytest.mark.parametrize('params', ['', 'granularity=week&group_by=client', 'granularity=month&group_by=contrato'])
+def test_connectivity_series(api, admin_client, params):
+    response = api(admin_client, 'get', f'/api/v1/analytics/connectivity-series/?{params}', max_queries=4)
+    assert response.status_code == 200
+    _assert_series(response.data, Register.objects.all())
+
+
+def test_connectivity_series_scoped(api, distribuidor_client, distribuidor_user):
+    response = api(distribuidor_client, 'get', '/api/v1/analytics/connectivity-series/', max_queries=4)
+    assert response.status_code == 200
+    _assert_series(response.data, Register.objects.filter(distribuidor=distribuidor_user.distribuidor_id))
+
+
+def test_connectivity_series_default_range_in_the_evening(evening, admin_client):
+    response = admin_client.get('/api/v1/analytics/connectivity-series/')
+    assert response.status_code == 200
+    assert response.data['end_date'] == timezone.localdate().strftime('%Y-%m-%d')
+    assert response.data['dates'][-1] == response.data['end_date']
+    assert all(entry['connected'][-1] is not None for entry in response.data['series'])
+
+
+@pytest.mark.parametrize('param', ['group_id', 'client_id'])
+def test_connectivity_series_rejects_invalid_ids(admin_client, param):
+    response = admin_client.get(f'/api/v1/analytics/connectivity-series/?{param}=abc')
+    assert response.status_code == 400
@@ -0,0 +1,43 @@
+"""
+Retention: manage.py archive_registers to the archive tables
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from apps.registers.models import Bitacora, BitacoraArchive, Register, RegisterArchive
+
+pytestmark = pytest.mark.django_db
+
+
+def test_archive_registers_moves_registers_with_their_bitacora():
+    cutoff = timezone.localdate() - timedelta(days=10)
+    old_ids = set(Register.objects.filter(report_date__lt=cutoff).values_list('id', flat=True))
+    old_entries = Bitacora.objects.filter(register_id__in=old_ids).count()
+    kept = Register.objects.count() - len(old_ids)
+    assert old_ids and old_entries
+
+    out = StringIO()
+    call_command('archive_registers', before=f'{cutoff:%Y-%m-%d}', batch_size=500, stdout=out)
+
+    assert set(RegisterArchive.objects.values_list('id', flat=True)) == old_ids
+    assert BitacoraArchive.objects.count() == old_entries
+    assert set(BitacoraArchive.objects.values_list('register_id', flat=True)) == old_ids
+    assert not Register.objects.filter(report_date__lt=cutoff).exists()
+    assert Register.objects.count() == kept
+    assert not Bitacora.objects.filter(register_id__in=old_ids).exists()
+    assert f'{len(old_ids)} registros y {old_entries} entradas de bitácora archivados' in out.getvalue()
+
+
+def test_archive_registers_dry_run_keeps_everything():
+    cutoff = timezone.localdate() - timedelta(days=10)
+    registers = Register.objects.count()
+
+    call_command('archive_registers', before=f'{cutoff:%Y-%m-%d}', dry_run=True, stdout=StringIO())
+
+    assert Register.objects.count() == registers
+    assert not RegisterArchive.objects.exists()
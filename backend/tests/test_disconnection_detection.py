@@ -0,0 +1,47 @@
+"""
+Batched disconnection detection (RegisterService.detect_disconnections_batch)
+"""
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from apps.registers.models import Bitacora, Register
+from apps.registers.services import RegisterService
+from apps.vehicles.models import Vehicle
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def without_returning_ids(monkeypatch):
+    """bulk_create sin pks de regreso, como en MySQL"""
+    monkeypatch.setattr(type(connection.features), 'can_return_rows_from_bulk_insert', False)
+
+
+def _feed(count):
+    return [
+        {'vehicle_id': vehicle_id, 'status': 0, 'client_name': 'Cliente'}
+        for vehicle_id in Vehicle.objects.order_by('id').values_list('vehicle_id', flat=True)[:count]
+    ]
+
+
+def test_detect_batch(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        registers = RegisterService.detect_disconnections_batch(_feed(50), batch_size=20)
+
+    assert len(registers) == 50
+    assert all(register.pk for register in registers)
+    assert Bitacora.objects.filter(register_id__in=[register.pk for register in registers]).count() == 50
+
+
+def test_detect_batch_reads_back_ids_in_the_evening(evening, without_returning_ids, django_capture_on_commit_callbacks):
+    # 20:00 local: report_date (auto_now_add, fecha local) no es la fecha UTC
+    with django_capture_on_commit_callbacks(execute=True):
+        registers = RegisterService.detect_disconnections_batch(_feed(50), batch_size=20)
+
+    assert len(registers) == 50
+    stored = Register.objects.in_bulk([register.pk for register in registers])
+    assert [stored[register.pk].vehicle_id for register in registers] == [register.vehicle_id for register in registers]
+    assert {register.report_date for register in stored.values()} == {timezone.localdate()}
+    assert Bitacora.objects.filter(register_id__in=list(stored)).count() == 50
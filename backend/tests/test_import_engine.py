@@ -0,0 +1,89 @@
+"""
+ImportEngine: per-record validation and local report dates
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.registers.models import Register
+from apps.vehicles.models import Vehicle, VehicleSnapshot
+from services.import_engine import ImportEngine
+
+pytestmark = pytest.mark.django_db
+
+
+def _record(vehicle_id, **values):
+    record = {
+        'vehicle_id': vehicle_id,
+        'vin': f'SZ{vehicle_id:015d}',
+        'client_id': 9001,
+        'client_name': 'Cliente Import',
+        'group_id': 9001,
+        'group_name': 'Grupo Import',
+        'geofence_name': None,
+        'speed': 20.0,
+        'latitude': 19.4,
+        'longitude': -99.1,
+        'last_communication_time': (timezone.localdate() - timedelta(days=2)).isoformat(),
+    }
+    record.update(values)
+    return record
+
+
+def test_missing_speed_defaults_to_zero():
+    stats = ImportEngine().run([_record(900001), _record(900002, speed=None), _record(900003, speed=float('nan'))])
+
+    assert stats['errors'] == 0
+    assert stats['vehicles_created'] == 3
+    assert Vehicle.objects.get(vehicle_id=900002).speed == 0
+    assert Register.objects.get(vehicle__vehicle_id=900002).disconnection_kind == Register.KIND_BASE
+
+
+def test_invalid_records_are_skipped():
+    engine = ImportEngine()
+    stats = engine.run([
+        _record(900001),
+        _record(900002, latitude='norte'),
+        _record(900003, speed='rápido'),
+        _record(900004, vin=None),
+        _record(900005),
+    ])
+
+    assert stats['errors'] == 3
+    assert len(engine.error_messages) == 3
+    assert stats['vehicles_created'] == 2
+    assert set(Vehicle.objects.filter(vehicle_id__gte=900001).values_list('vehicle_id', flat=True)) == {900001, 900005}
+
+
+def test_failed_batch_is_retried_per_record(monkeypatch):
+    load_registers = ImportEngine._load_registers
+
+    def failing(self, records, vehicles, stats):
+        if any(record['vehicle_id'] == 900002 for record in records):
+            raise RuntimeError('fallo de escritura')
+        return load_registers(self, records, vehicles, stats)
+
+    monkeypatch.setattr(ImportEngine, '_load_registers', failing)
+    stats = ImportEngine().run([_record(900001), _record(900002), _record(900003)])
+
+    assert stats['errors'] == 1
+    assert stats['vehicles_created'] == 2
+    assert stats['registers_created'] == 2
+    assert not Vehicle.objects.filter(vehicle_id=900002).exists()
+    assert VehicleSnapshot.objects.filter(vehicle__vehicle_id__gte=900001).count() == 2
+
+
+def test_evening_runs_use_the_local_date(evening):
+    today = timezone.localdate()
+    records = [_record(900001), _record(900002, last_communication_time=evening.isoformat())]
+
+    first = ImportEngine().run(records)
+    second = ImportEngine().run(records)
+
+    assert first['registers_created'] == 1
+    assert second['registers_created'] == 0
+    assert list(Register.objects.filter(vehicle__vehicle_id=900001).values_list('report_date', flat=True)) == [today]
+    snapshots = VehicleSnapshot.objects.filter(vehicle__vehicle_id__gte=900001)
+    assert set(snapshots.values_list('snapshot_date', 'connected')) == {(today, False), (today, True)}
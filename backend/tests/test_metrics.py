@@ -0,0 +1,30 @@
+"""
+/metrics access: bearer token, or DEBUG when no token is configured
+"""
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+# 503 cuando prometheus_client no está instalado
+SERVED = (200, 503)
+
+
+def test_metrics_without_token_is_forbidden(client, settings):
+    settings.METRICS_TOKEN = ''
+    settings.DEBUG = False
+    assert client.get('/metrics').status_code == 403
+
+
+def test_metrics_without_token_in_debug(client, settings):
+    settings.METRICS_TOKEN = ''
+    settings.DEBUG = True
+    assert client.get('/metrics').status_code in SERVED
+
+
+def test_metrics_with_token(client, settings):
+    settings.METRICS_TOKEN = 's3cret'
+    settings.DEBUG = False
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 401
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret').status_code in SERVED
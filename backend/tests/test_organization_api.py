@@ -0,0 +1,50 @@
+"""
+Query budgets: organization endpoints (distribuidores, clientes, grupos)
+"""
+
+import pytest
+
+from apps.organization.models import Client, Distribuidor, Group
+
+pytestmark = pytest.mark.django_db
+
+
+def test_distribuidor_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/organization/distribuidores/', max_queries=2)
+    assert response.status_code == 200
+
+
+def test_distribuidor_detail(api, admin_client):
+    distribuidor = Distribuidor.objects.get(distribuidor_id=1)
+    response = api(admin_client, 'get', f'/api/v1/organization/distribuidores/{distribuidor.pk}/', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_client_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/organization/clients/', max_queries=2)
+    assert response.status_code == 200
+    assert response.data['count'] == Client.objects.count()
+
+
+def test_client_detail(api, admin_client):
+    client = Client.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/organization/clients/{client.pk}/', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_group_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/organization/groups/', max_queries=2)
+    assert response.status_code == 200
+    assert response.data['count'] == Group.objects.count()
+
+
+def test_group_list_filtered_by_client(api, admin_client):
+    client = Client.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/organization/groups/?client={client.pk}', max_queries=3)
+    assert response.status_code == 200
+
+
+def test_group_detail(api, admin_client):
+    group = Group.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/organization/groups/{group.pk}/', max_queries=1)
+    assert response.status_code == 200
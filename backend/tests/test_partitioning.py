@@ -0,0 +1,132 @@
+"""
+DDL of core.partitioning, with the engine and its catalog stubbed
+(the suite runs on SQLite)
+"""
+
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+from apps.registers.models import Bitacora, Register
+from core import partitioning
+
+pytestmark = pytest.mark.django_db
+
+MONTHS = [date(2026, 8, 1), date(2026, 9, 1), date(2026, 10, 1)]
+
+
+class StubConnection:
+    """Motor `vendor` sobre la conexión SQLite: quoting y schema editor genéricos"""
+
+    def __init__(self, vendor):
+        self.vendor = vendor
+        self.ops = connection.ops
+
+    def schema_editor(self, collect_sql=False):
+        return BaseDatabaseSchemaEditor(connection, collect_sql=collect_sql)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    """Catálogo en memoria: tablas particionadas, particiones y FKs existentes"""
+    state = {
+        'partitioned': set(),
+        'months': {},
+        'incoming': {'registers_register': [('registers_bitacora', 'registers_bitacora_register_id_fk')]},
+        'outgoing': {'registers_bitacora': ['registers_bitacora_user_id_fk']},
+    }
+    monkeypatch.setattr(partitioning, 'is_partitioned', lambda conn, table: table in state['partitioned'])
+    monkeypatch.setattr(partitioning, 'existing_months', lambda conn, table: set(state['months'].get(table, ())))
+    monkeypatch.setattr(partitioning, '_incoming_foreign_keys', lambda conn, table: state['incoming'].get(table, []))
+    monkeypatch.setattr(partitioning, '_mysql_foreign_keys', lambda conn, table: state['outgoing'].get(table, []))
+    return state
+
+
+def test_convert_postgresql_drops_incoming_foreign_keys_first(catalog):
+    statements = partitioning.convert_table_sql(StubConnection('postgresql'), Register, 'report_date', MONTHS)
+
+    assert statements[0] == 'ALTER TABLE "registers_bitacora" DROP CONSTRAINT "registers_bitacora_register_id_fk"'
+    assert statements[1] == 'ALTER TABLE "registers_register" RENAME TO "registers_register_legacy"'
+    assert 'PARTITION BY RANGE ("report_date")' in statements[2]
+    assert statements[3] == 'ALTER TABLE "registers_register" ADD PRIMARY KEY ("id", "report_date")'
+    assert statements[4] == 'CREATE TABLE "registers_register_default" PARTITION OF "registers_register" DEFAULT'
+    assert statements[5:8] == [
+        'CREATE TABLE IF NOT EXISTS "registers_register_p202608" PARTITION OF "registers_register" '
+        "FOR VALUES FROM ('2026-08-01') TO ('2026-09-01')",
+        'CREATE TABLE IF NOT EXISTS "registers_register_p202609" PARTITION OF "registers_register" '
+        "FOR VALUES FROM ('2026-09-01') TO ('2026-10-01')",
+        'CREATE TABLE IF NOT EXISTS "registers_register_p202610" PARTITION OF "registers_register" '
+        "FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')",
+    ]
+    assert statements.index('DROP TABLE "registers_register_legacy"') > statements.index(
+        'INSERT INTO "registers_register" SELECT * FROM "registers_register_legacy"'
+    )
+    # Índices y FKs salientes se recrean desde el modelo
+    assert any('REFERENCES "vehicles_vehicle"' in statement for statement in statements)
+    for index in Register._meta.indexes:
+        assert any(f'CREATE INDEX "{index.name}"' in statement for statement in statements)
+
+
+def test_convert_postgresql_skips_foreign_keys_to_partitioned_tables(catalog):
+    catalog['partitioned'].add('registers_register')
+
+    statements = partitioning.convert_table_sql(StubConnection('postgresql'), Bitacora, 'created_at', MONTHS)
+
+    assert not any('REFERENCES "registers_register"' in statement for statement in statements)
+    assert any('REFERENCES "organization_user"' in statement for statement in statements)
+    # created_at es DateTimeField: límites en UTC
+    assert "FOR VALUES FROM ('2026-08-01 00:00:00+00') TO ('2026-09-01 00:00:00+00')" in statements[4]
+
+
+def test_convert_mysql(catalog):
+    statements = partitioning.convert_table_sql(StubConnection('mysql'), Register, 'report_date', MONTHS)
+
+    assert statements == [
+        'ALTER TABLE "registers_bitacora" DROP FOREIGN KEY "registers_bitacora_register_id_fk"',
+        'ALTER TABLE "registers_register" DROP PRIMARY KEY, ADD PRIMARY KEY ("id", "report_date")',
+        'ALTER TABLE "registers_register" PARTITION BY RANGE COLUMNS("report_date") ('
+        "PARTITION p202608 VALUES LESS THAN ('2026-09-01'), "
+        "PARTITION p202609 VALUES LESS THAN ('2026-10-01'), "
+        "PARTITION p202610 VALUES LESS THAN ('2026-11-01'), "
+        'PARTITION p_future VALUES LESS THAN (MAXVALUE))',
+    ]
+
+
+def test_convert_mysql_drops_outgoing_foreign_keys(catalog):
+    statements = partitioning.convert_table_sql(StubConnection('mysql'), Bitacora, 'created_at', MONTHS)
+
+    assert statements[0] == 'ALTER TABLE "registers_bitacora" DROP FOREIGN KEY "registers_bitacora_user_id_fk"'
+    assert "PARTITION p202608 VALUES LESS THAN ('2026-09-01 00:00:00')" in statements[-1]
+
+
+def test_create_partitions_postgresql_only_missing_months(catalog):
+    catalog['months']['registers_register'] = {date(2026, 8, 1), date(2026, 9, 1)}
+
+    statements = partitioning.create_partitions_sql(StubConnection('postgresql'), Register, 'report_date', MONTHS)
+
+    assert statements == [
+        'CREATE TABLE IF NOT EXISTS "registers_register_p202610" PARTITION OF "registers_register" '
+        "FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')",
+    ]
+
+
+def test_create_partitions_mysql_splits_future_partition(catalog):
+    # Un hueco antes de la última partición no se puede agregar en MySQL
+    catalog['months']['registers_register'] = {date(2026, 7, 1), date(2026, 9, 1)}
+
+    statements = partitioning.create_partitions_sql(StubConnection('mysql'), Register, 'report_date', MONTHS)
+
+    assert statements == [
+        'ALTER TABLE "registers_register" REORGANIZE PARTITION p_future INTO ('
+        "PARTITION p202610 VALUES LESS THAN ('2026-11-01'), "
+        'PARTITION p_future VALUES LESS THAN (MAXVALUE))',
+    ]
+
+
+def test_create_partitions_nothing_to_do(catalog):
+    catalog['months']['registers_register'] = set(MONTHS)
+
+    assert partitioning.create_partitions_sql(StubConnection('mysql'), Register, 'report_date', MONTHS) == []
+    assert partitioning.create_partitions_sql(StubConnection('postgresql'), Register, 'report_date', MONTHS) == []
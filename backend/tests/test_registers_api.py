@@ -0,0 +1,146 @@
+"""
+Query budgets: registers (concentrado) and bitácora
+"""
+
+import csv
+import io
+from datetime import date
+
+import pytest
+
+from apps.registers.models import Bitacora, Register
+
+pytestmark = pytest.mark.django_db
+
+
+def test_register_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/?page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 100
+
+
+def test_register_list_without_count(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/?page_size=100&count=false', max_queries=1)
+    assert response.status_code == 200
+    assert response.json()['count'] is None
+
+
+def test_register_list_cursor(api, admin_client, follow_cursor):
+    response = api(admin_client, 'get', '/api/v1/registers/?pagination=cursor&page_size=100', max_queries=1)
+    assert response.status_code == 200
+    assert response.json()['next']
+    ids = follow_cursor(response)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(Register.objects.values_list('id', flat=True))
+
+
+def test_register_list_search(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/?search=SZ&page_size=100', max_queries=2)
+    assert response.status_code == 200
+
+
+def test_register_list_scoped(api, distribuidor_client, distribuidor_user):
+    response = api(distribuidor_client, 'get', '/api/v1/registers/?page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert response.json()['count'] == Register.objects.filter(distribuidor=distribuidor_user.distribuidor_id).count()
+
+
+def test_register_detail(api, admin_client):
+    register = Register.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/registers/{register.pk}/', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_register_update(api, admin_client):
+    register = Register.objects.first()
+    response = api(
+        admin_client, 'patch', f'/api/v1/registers/{register.pk}/',
+        max_queries=2, data={'estatus_final': Register.ESTATUS_TALLER}, format='json'
+    )
+    assert response.status_code == 200
+
+
+def test_register_update_problem_derives_kind(admin_client):
+    register = Register.objects.filter(disconnection_kind=Register.KIND_BASE).first()
+    response = admin_client.patch(
+        f'/api/v1/registers/{register.pk}/',
+        data={'problem': 'Desconexión en trayecto', 'disconnection_kind': Register.KIND_BASE}, format='json'
+    )
+    assert response.status_code == 200
+    register.refresh_from_db()
+    assert register.disconnection_kind == Register.kind_from_problem('Desconexión en trayecto')
+
+
+def test_register_bulk_update(api, admin_client):
+    ids = list(Register.objects.values_list('pk', flat=True)[:500])
+    response = api(
+        admin_client, 'post', '/api/v1/registers/bulk-update/',
+        max_queries=10, format='json',
+        data={'ids': ids, 'changes': {'responsable': Register.RESPONSABLE_REVISION_FISICA}}
+    )
+    assert response.status_code == 200
+    assert response.data['updated'] == len(ids)
+    assert Bitacora.objects.filter(register_id__in=ids).count() == 2 * len(ids)
+
+
+def test_register_export_csv(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/export/', max_queries=1)
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+    assert len(rows) - 1 == Register.objects.count()
+
+
+def test_register_export_escapes_formulas(admin_client):
+    register = Register.objects.first()
+    Register.objects.filter(pk=register.pk).update(problem='=HYPERLINK("http://x")', comentario='@SUM(1)')
+    response = admin_client.get(f'/api/v1/registers/export/?search={register.vehicle.vin}')
+    content = b''.join(response.streaming_content).decode()
+    assert '"\'=HYPERLINK(""http://x"")"' in content
+    assert "'@SUM(1)" in content
+
+
+def test_register_export_xlsx(api, admin_client):
+    pytest.importorskip('openpyxl')
+    response = api(admin_client, 'get', '/api/v1/registers/export/?format=xlsx', max_queries=1)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('group_by', ['estatus_final', 'responsable', 'tipo', 'kind', 'estatus_final,kind'])
+def test_register_by_status(api, admin_client, group_by):
+    response = api(admin_client, 'get', f'/api/v1/registers/by_status/?group_by={group_by}', max_queries=1)
+    assert response.status_code == 200
+    date_range = (date.fromisoformat(response.data['start_date']), date.fromisoformat(response.data['end_date']))
+    assert response.data['total'] == Register.objects.filter(report_date__range=date_range).count()
+    assert sum(entry['total'] for entry in response.data['results']) == response.data['total']
+
+
+def test_register_by_status_scoped(api, distribuidor_client, distribuidor_user):
+    own = Register.objects.filter(distribuidor=distribuidor_user.distribuidor_id)
+    group_id = own.values_list('group_id', flat=True).first()
+    response = api(distribuidor_client, 'get', f'/api/v1/registers/by_status/?group_id={group_id}', max_queries=1)
+    assert response.status_code == 200
+    date_range = (date.fromisoformat(response.data['start_date']), date.fromisoformat(response.data['end_date']))
+    assert response.data['total'] == own.filter(group_id=group_id, report_date__range=date_range).count()
+
+
+@pytest.mark.parametrize('group_id', ['abc', '1.5'])
+def test_register_by_status_rejects_invalid_group_id(api, admin_client, group_id):
+    response = api(admin_client, 'get', f'/api/v1/registers/by_status/?group_id={group_id}', max_queries=0)
+    assert response.status_code == 400
+
+
+def test_bitacora_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/bitacora/?page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 100
+
+
+def test_bitacora_list_cursor(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/registers/bitacora/?pagination=cursor&page_size=100', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_bitacora_detail(api, admin_client):
+    entry = Bitacora.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/registers/bitacora/{entry.pk}/', max_queries=1)
+    assert response.status_code == 200
@@ -0,0 +1,40 @@
+"""
+Disconnection counters (DisconnectionCounterService) against local report dates
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.registers.models import Register
+from apps.vehicles.models import Vehicle
+from apps.vehicles.services import DisconnectionCounterService
+
+pytestmark = pytest.mark.django_db
+
+
+def _expected(today):
+    dark_today = set(Register.objects.filter(report_date=today).values_list('vehicle_id', flat=True))
+    last_7 = Register.objects.filter(report_date__range=(today - timedelta(days=6), today))
+    return dark_today, last_7.count()
+
+
+@pytest.mark.parametrize('method', ['refresh_counters', 'rebuild_counters'])
+def test_counters_use_local_date_in_the_evening(evening, method):
+    dark_today, registers_7d = _expected(timezone.localdate(evening))
+    assert dark_today
+
+    result = getattr(DisconnectionCounterService, method)()
+
+    assert result['dark_today'] == len(dark_today)
+    streaks = Vehicle.objects.filter(disconnection_streak__gt=0)
+    assert set(streaks.values_list('id', flat=True)) == dark_today
+    assert sum(Vehicle.objects.values_list('disconnections_7d', flat=True)) == registers_7d
+
+
+def test_top_disconnected_window_uses_local_date(evening):
+    start = timezone.localdate(evening) - timedelta(days=2)
+    expected = Register.objects.filter(report_date__gte=start).count()
+    vehicles = Vehicle.objects.top_disconnected(3)
+    assert sum(vehicle.disconnection_count for vehicle in vehicles) == expected
@@ -0,0 +1,129 @@
+"""
+Query budgets: vehicles, geofences and contratos
+Page size is 20, so a per-row query in a serializer adds 20+ queries and
+breaks the budget.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from apps.vehicles.models import Contrato, Geofence, Vehicle
+
+pytestmark = pytest.mark.django_db
+
+
+def test_vehicle_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 20
+
+
+def test_vehicle_list_max_page_size(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/?page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 100
+
+
+def test_vehicle_list_fast(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/?fast=true&page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 100
+
+
+def test_vehicle_list_cursor(api, admin_client, follow_cursor):
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/?pagination=cursor&page_size=100', max_queries=1)
+    assert response.status_code == 200
+    assert response.json()['next']
+    ids = follow_cursor(response)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == set(Vehicle.objects.values_list('id', flat=True))
+
+
+def test_vehicle_list_filtered_and_ordered(api, admin_client):
+    vehicle = Vehicle.objects.first()
+    response = api(
+        admin_client, 'get',
+        f'/api/v1/vehicles/data/?group={vehicle.group_id}&ordering=-disconnections_30d',
+        max_queries=3
+    )
+    assert response.status_code == 200
+
+
+def test_vehicle_list_scoped(api, distribuidor_client, distribuidor_user):
+    response = api(distribuidor_client, 'get', '/api/v1/vehicles/data/?page_size=100', max_queries=2)
+    assert response.status_code == 200
+    assert {row['distribuidor_name'] for row in response.json()['results']} == {distribuidor_user.distribuidor.distribuidor_name}
+
+
+def test_vehicle_detail(api, admin_client):
+    vehicle = Vehicle.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/vehicles/data/{vehicle.pk}/', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_vehicle_statistics(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/statistics/', max_queries=1)
+    assert response.status_code == 200
+    vehicles = list(Vehicle.objects.all())
+    disconnected = [vehicle for vehicle in vehicles if vehicle.connection_status]
+    assert response.data == {
+        'total': len(vehicles),
+        'conectados': len(vehicles) - len(disconnected),
+        'desconectados': len(disconnected),
+        'desconectados_trayecto': sum(vehicle.speed > 0 for vehicle in disconnected),
+        'desconectados_base': sum(vehicle.speed <= 0 for vehicle in disconnected),
+    }
+    assert 0 < response.data['desconectados'] < response.data['total']
+
+
+def test_vehicle_statistics_in_the_evening(api, admin_client, evening):
+    # 20:00 local (ya es mañana en UTC): visto a las 17:00 de hoy está
+    # conectado; a las 23:00 de ayer (hoy en UTC) está desconectado
+    ids = list(Vehicle.objects.order_by('id').values_list('id', flat=True))
+    Vehicle.objects.filter(id__in=ids[::2]).update(last_connection=evening - timedelta(hours=3))
+    Vehicle.objects.filter(id__in=ids[1::2]).update(last_connection=evening - timedelta(hours=21), speed=0)
+    connected = len(ids[::2])
+
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/statistics/', max_queries=1)
+    assert response.status_code == 200
+    assert response.data['conectados'] == connected
+    assert response.data['desconectados'] == response.data['desconectados_base'] == len(ids) - connected
+
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/?fast=true&page_size=100', max_queries=2)
+    # Orden por -last_connection: la primera página son los vistos a las 17:00
+    assert not any(row['connection_status'] for row in response.json()['results'])
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/?fast=true&ordering=last_connection', max_queries=2)
+    assert all(row['connection_status'] for row in response.json()['results'])
+    assert not Vehicle.objects.get(id=ids[0]).connection_status
+    assert Vehicle.objects.get(id=ids[1]).connection_status
+
+
+def test_vehicle_statistics_cached(api, admin_client):
+    admin_client.get('/api/v1/vehicles/data/statistics/')
+    response = api(admin_client, 'get', '/api/v1/vehicles/data/statistics/', max_queries=0)
+    assert response.status_code == 200
+
+
+def test_geofence_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/geofences/', max_queries=2)
+    assert response.status_code == 200
+    assert response.data['count'] == Geofence.objects.count()
+
+
+def test_geofence_detail(api, admin_client):
+    geofence = Geofence.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/vehicles/geofences/{geofence.pk}/', max_queries=1)
+    assert response.status_code == 200
+
+
+def test_contrato_list(api, admin_client):
+    response = api(admin_client, 'get', '/api/v1/vehicles/contratos/', max_queries=2)
+    assert response.status_code == 200
+    assert response.data['count'] == Contrato.objects.count()
+
+
+def test_contrato_detail(api, admin_client):
+    contrato = Contrato.objects.first()
+    response = api(admin_client, 'get', f'/api/v1/vehicles/contratos/{contrato.pk}/', max_queries=1)
+    assert response.status_code == 200
@@ -6,6 +6,9 @@ import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api/v1';
 
+// Tamaño de página por defecto (el backend acepta ?page_size= hasta su máximo)
+export const PAGE_SIZE = 20;
+
 // Crear instancia de Axios
 const apiClient = axios.create({
   baseURL: API_BASE_URL,
@@ -61,7 +64,7 @@ apiClient.interceptors.response.use(
 export const fetchRegisters = async (page = 1, filters = {}) => {
   const params = {
     page,
-    page_size: 20,
+    page_size: PAGE_SIZE,
     ...filters,
   };
 
@@ -69,6 +72,43 @@ export const fetchRegisters = async (page = 1, filters = {}) => {
   return response.data;
 };
 
+/**
+ * Obtener registros con paginación por cursor (keyset).
+ * Cada página cuesta lo mismo sin importar qué tan profundo se navegue;
+ * la respuesta trae `next`/`previous` pero no `count`.
+ */
+export const fetchRegistersByCursor = async (cursor = null, filters = {}) => {
+  const params = {
+    pagination: 'cursor',
+    page_size: PAGE_SIZE,
+    ...filters,
+  };
+  if (cursor) {
+    params.cursor = cursor;
+  }
+
+  const response = await apiClient.get('/registers/', { params });
+  return response.data;
+};
+
+/**
+ * Extraer el cursor de un link `next`/`previous` de la API
+ */
+export const getCursorFromUrl = (url) => (url ? new URL(url).searchParams.get('cursor') : null);
+
+/**
+ * Exportar el Concentrado completo (mismos filtros que el listado).
+ * Regresa un Blob CSV o XLSX generado en streaming por el backend.
+ */
+export const exportRegisters = async (filters = {}, format = 'csv') => {
+  const response = await apiClient.get('/registers/export/', {
+    params: { ...filters, format },
+    responseType: 'blob',
+    timeout: 0, // Exportaciones grandes pueden tardar más que el timeout general
+  });
+  return response.data;
+};
+
 /**
  * Obtener un registro por ID
  */
@@ -103,7 +143,7 @@ export const createRegister = async (data) => {
 export const fetchVehicles = async (page = 1, filters = {}) => {
   const params = {
     page,
-    page_size: 20,
+    page_size: PAGE_SIZE,
     ...filters,
   };
 
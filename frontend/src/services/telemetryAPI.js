@@ -77,6 +77,13 @@ const telemetryAPI = {
   getTopDisconnectedVehicles: (params = {}) => {
     return apiClient.get('/analytics/top-disconnected/', { params });
   },
+
+  /**
+   * Obtener series de conectividad (day/week/month) por grupo, cliente o contrato
+   */
+  getConnectivitySeries: (params = {}) => {
+    return apiClient.get('/analytics/connectivity-series/', { params });
+  },
 };
 
 export default telemetryAPI;